@@ -5,15 +5,20 @@ import os
 import sys
 import uuid
 import time
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import List, Tuple
 import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
 from datetime import datetime
 
 # Add project root directory to Python path
 sys.path.append(str(Path(__file__).parent.parent))
 import disable_ssl_verification
 from src.config import Config
-from src.chains.faiss_conversational_chain import get_conversational_chain
+from src.chains.faiss_conversational_chain import FAISSConversationalRAGChain
 __import__('pysqlite3')
 import sys
 sys.modules['sqlite3'] = sys.modules.pop('pysqlite3')
@@ -139,10 +144,64 @@ st.markdown("""
 
 # --- Logic Functions ---
 
+# Per-thread 1 MiB copy buffer, reused across uploads instead of allocating one chunk per read
+_copy_buffers = threading.local()
+
+def _copy_upload(src, dst) -> None:
+    """Stream an uploaded file into an open binary file through the thread's reusable buffer"""
+    buffer = getattr(_copy_buffers, "buffer", None)
+    if buffer is None:
+        buffer = _copy_buffers.buffer = bytearray(1 << 20)
+    view = memoryview(buffer)
+    src.seek(0)
+    while n := src.readinto(buffer):
+        dst.write(view[:n])
+
+@st.cache_data(ttl=5, show_spinner=False)
+def _cached_docs(record_mtime: int):
+    """
+    List processed documents as (doc_id, filename) pairs
+    
+    Keyed on the processed-docs record mtime so reruns skip the file read
+    until the knowledge base actually changes.
+    """
+    from src.loaders.document_loader import get_document_loader
+    return get_document_loader().list_all_processed_documents()
+
+def _record_mtime() -> int:
+    """Get the processed-docs record mtime, 0 if it does not exist yet"""
+    try:
+        return Config.PROCESSED_DOCS_RECORD.stat().st_mtime_ns
+    except FileNotFoundError:
+        return 0
+
+def _references_html(files) -> str:
+    """Build the references box HTML for a list of file names"""
+    items = "<br>".join(f"• {f}" for f in files)
+    return f"""
+    <div class="references-box">
+        <b>References:</b><br>
+        {items}
+    </div>
+    """
+
+def get_conversational_chain(session_id: str) -> FAISSConversationalRAGChain:
+    """
+    Create the conversation chain for a session
+    
+    Callers keep it in st.session_state, so it survives reruns and is released
+    with its checkpointer connection when the session ends. The chat model
+    client and FAISS index are process-wide singletons shared by every chain.
+    """
+    return FAISSConversationalRAGChain(session_id)
+
 def generate_session_id():
-    """Generate a unique session ID"""
-    # return f"session_{int(time.time())}_{uuid.uuid4().hex[:8]}"
-    return f"session_123"
+    """Generate a session ID unique to the browser tab"""
+    ctx = get_script_run_ctx()
+    if ctx is not None:
+        # Streamlit's session ID is stable across reruns within one tab
+        return f"session_{ctx.session_id.replace('-', '')}"
+    return f"session_{uuid.uuid4().hex[:8]}"
 
 def init_session():
     """Initialize session state"""
@@ -155,30 +214,93 @@ def init_session():
     if "chatbot" not in st.session_state:
         st.session_state.chatbot = get_conversational_chain(st.session_state.session_id)
 
+@st.cache_resource(show_spinner=False)
+def get_ingest_pool() -> ThreadPoolExecutor:
+    """Get the worker pool that chunks, embeds and indexes uploads off the UI thread"""
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="ingest")
+
+def _ingest_upload(chatbot: FAISSConversationalRAGChain, tmp_path: Path, file_name: str):
+    """Add a streamed upload to the knowledge base (runs on the ingest pool)"""
+    try:
+        return chatbot.add_documents(tmp_path, file_name=file_name)
+    finally:
+        # The loader moves the file into place; remove it if it was skipped
+        tmp_path.unlink(missing_ok=True)
+
+def _ingest_uploads(chatbot: FAISSConversationalRAGChain, files: List[Tuple[Path, str]]):
+    """Add several streamed uploads to the knowledge base at once (runs on the ingest pool)"""
+    try:
+        return chatbot.add_document_batch(files)
+    finally:
+        for tmp_path, _ in files:
+            tmp_path.unlink(missing_ok=True)
+
 def upload_document():
-    """Upload document to knowledge base"""
-    uploaded_file = st.session_state.uploaded_file
+    """Upload documents to knowledge base"""
+    uploaded_files = st.session_state.uploaded_file or []
     
-    if uploaded_file:
+    # on_change fires for every change to the list, only submit files not submitted yet
+    submitted = st.session_state.submitted_uploads
+    new_files = [f for f in uploaded_files if f.file_id not in submitted]
+    st.session_state.submitted_uploads = {f.file_id for f in uploaded_files}
+    
+    if new_files:
+        files = []
         try:
-            with st.spinner("Processing document, please wait..."):
-                # Load document and add to vector store
-                message = st.session_state.chatbot.add_documents(uploaded_file)
-                if message:
-                    st.toast(f"{message}", icon="⚠️")
-                    return
-                # Update session state
-                st.toast(f"Document '{uploaded_file.name}' successfully added to knowledge base", icon="✅")
-                time.sleep(1) # Let user see the notification
+            # Stream each upload to disk in 1 MiB chunks instead of handing the in-memory buffer around
+            for uploaded_file in new_files:
+                with tempfile.NamedTemporaryFile(
+                    dir=Config.DOCUMENTS_DIR, suffix=Path(uploaded_file.name).suffix, delete=False
+                ) as tmp:
+                    files.append((Path(tmp.name), uploaded_file.name))
+                    _copy_upload(uploaded_file, tmp)
+            
+            # Load documents and add to vector store in the background, upload_status reports the result
+            if len(files) == 1:
+                future = get_ingest_pool().submit(_ingest_upload, st.session_state.chatbot, *files[0])
+            else:
+                future = get_ingest_pool().submit(_ingest_uploads, st.session_state.chatbot, files)
+            st.session_state.pending_uploads[", ".join(name for _, name in files)] = future
         except Exception as e:
+            for tmp_path, _ in files:
+                tmp_path.unlink(missing_ok=True)
+            # Let the next change to the list retry them
+            st.session_state.submitted_uploads -= {f.file_id for f in new_files}
             st.error(f"Upload failed: {str(e)}")
 
+@st.fragment(run_every=1)
+def upload_status():
+    """Show uploads still being processed and report finished ones"""
+    pending = st.session_state.pending_uploads
+    finished = [name for name, future in pending.items() if future.done()]
+    
+    for name in pending:
+        if name not in finished:
+            st.caption(f"⏳ Processing {name}...")
+    
+    for name in finished:
+        future = pending.pop(name)
+        try:
+            message = future.result()
+        except Exception as e:
+            st.toast(f"Upload failed: {str(e)}", icon="❌")
+            continue
+        if message:
+            st.toast(f"{message}", icon="⚠️")
+        else:
+            _cached_docs.clear()
+            st.toast(f"Document '{name}' successfully added to knowledge base", icon="✅")
+    
+    # Refresh the document list
+    if finished:
+        st.rerun()
+
 def delete_document(doc_id: str):
     """Delete document from knowledge base"""
     try:
         st.session_state.chatbot.delete_documents(doc_id)
+        _cached_docs.clear()
         st.toast(f"Removed {doc_id} from knowledge base", icon="🗑️")
-        time.sleep(0.5)
         st.rerun()
     except Exception as e:
         st.error(f"Deletion failed: {str(e)}")
@@ -187,6 +309,7 @@ def clear_knowledge_base():
     """Clear all documents from knowledge base and reset chat"""
     try:
         st.session_state.chatbot.clear_documents()
+        _cached_docs.clear()
         st.session_state.messages = []
         st.session_state.messages.append({
             "role": "assistant",
@@ -194,7 +317,6 @@ def clear_knowledge_base():
             "timestamp": datetime.now().isoformat()
         })
         st.toast("Knowledge base completely cleared", icon="✨")
-        time.sleep(0.5)
         st.rerun()
     except Exception as e:
         st.error(f"Clearing failed: {str(e)}")
@@ -210,6 +332,12 @@ def init_session_state():
     if "messages" not in st.session_state:
         st.session_state.messages = []
 
+    if "pending_uploads" not in st.session_state:
+        st.session_state.pending_uploads = {}
+    
+    if "submitted_uploads" not in st.session_state:
+        st.session_state.submitted_uploads = set()
+
     if "chatbot" not in st.session_state:
         try:
             st.session_state.chatbot = get_conversational_chain(st.session_state.session_id)
@@ -224,8 +352,6 @@ init_session_state()
 def main():
     """Main function"""
     init_session_state()
-    from src.loaders.document_loader import get_document_loader
-    document_loader = get_document_loader()
     
     # --- Sidebar Design ---
     with st.sidebar:
@@ -238,30 +364,24 @@ def main():
         uploaded_file = st.file_uploader(
             "Supports PDF, TXT, DOCX, MD",
             type=["pdf", "txt", "docx", "md"],
+            accept_multiple_files=True,
             key="uploaded_file",
             on_change=upload_document,
             label_visibility="collapsed"
         )
+        upload_status()
         
         st.markdown("---")
         
         # 2. Document List Area
         st.markdown("### Knowledge Base Documents")
         
-        processed_docs = document_loader.list_all_processed_documents()
+        processed_docs = _cached_docs(_record_mtime())
         
         if processed_docs:
             # Using container to limit height, although Streamlit sidebar has scrolling, this helps with visual layering
             with st.container():
-                for doc_id in processed_docs:
-                    # Filename extraction logic
-                    if "UploadedFile" in doc_id:
-                        import re
-                        match = re.search(r"name='([^']+)'", doc_id)
-                        filename = match.group(1) if match else doc_id
-                    else:
-                        filename = doc_id.split('/')[-1] if '/' in doc_id else doc_id
-                    
+                for doc_id, filename in processed_docs:
                     # Custom HTML card layout
                     col_doc, col_del = st.columns([0.85, 0.15])
                     with col_doc:
@@ -340,17 +460,7 @@ def main():
                 # Display reference sources
                 metadata = message.get("metadata", {})
                 if "reference_files" in metadata and metadata["reference_files"]:
-                    files = metadata["reference_files"]
-                    if files:
-                        st.markdown(
-                            f"""
-                            <div class="references-box">
-                                <b>References:</b><br>
-                                {"<br>".join([f"• {f}" for f in files])}
-                            </div>
-                            """, 
-                            unsafe_allow_html=True
-                        )
+                    st.markdown(_references_html(metadata["reference_files"]), unsafe_allow_html=True)
     
     
     # Chat input processing
@@ -372,7 +482,17 @@ def main():
         # 2. Generate response
         with st.chat_message("assistant"):
             message_placeholder = st.empty()
-            full_response_buffer = ""
+            # Collect streamed text in a list and re-render at most ~20 times per second
+            response_parts = []
+            last_flush = time.monotonic()
+            
+            def append_text(text: str):
+                nonlocal last_flush
+                response_parts.append(text)
+                now = time.monotonic()
+                if now - last_flush > 0.05:
+                    message_placeholder.markdown("".join(response_parts) + "▌")
+                    last_flush = now
             
             try:
                 # Progress indicator
@@ -398,18 +518,16 @@ def main():
                                 if isinstance(last.content, list):
                                     for item in last.content:
                                         if item.get("type") == "text":
-                                            full_response_buffer += item.get("text", "")
-                                            message_placeholder.markdown(full_response_buffer + "▌")
+                                            append_text(item.get("text", ""))
                                 elif isinstance(last.content, str):
-                                    full_response_buffer += last.content
-                                    message_placeholder.markdown(full_response_buffer + "▌")
+                                    append_text(last.content)
                             
                             # Tool call hints (optional, not as final reply)
                             if hasattr(last, "tool_calls") and last.tool_calls:
                                 names = [tc.get("name", "") for tc in last.tool_calls]
                                 # Here you can choose whether to display the tool call process
                                 # For a cleaner interface, you can choose to only print in the backend or display temporary status
-                                # message_placeholder.markdown(full_response_buffer + f"\n\n*Searching knowledge base: {', '.join(names)}...*")
+                                # message_placeholder.markdown("".join(response_parts) + f"\n\n*Searching knowledge base: {', '.join(names)}...*")
 
                     # Process tools messages
                     elif "tools" in chunk and "messages" in chunk["tools"]:
@@ -418,34 +536,21 @@ def main():
                             last = messages[0]
                             if hasattr(last, "content") and last.content:
                                 # Tool return content is usually for the model to see, direct display may not look good, decide whether to append based on needs
-                                full_response_buffer += last.content
-                                message_placeholder.markdown(full_response_buffer + "▌")
+                                append_text(last.content)
                 
                 # Remove cursor
+                full_response_buffer = "".join(response_parts)
                 message_placeholder.markdown(full_response_buffer)
                 
                 # Get reference sources
                 retrieved_docs = st.session_state.chatbot.retrieval_tool.get_last_docs()
-                reference_files = []
+                # dict.fromkeys deduplicates while keeping retrieval order
+                reference_files = list(dict.fromkeys(
+                    doc.metadata.get("file_name", "Unknown document") for doc in retrieved_docs
+                ))
                 
-                if retrieved_docs:
-                    displayed_files = set()
-                    for doc in retrieved_docs:
-                        file_name = doc.metadata.get("file_name", "Unknown document")
-                        if file_name not in displayed_files:
-                            displayed_files.add(file_name)
-                            reference_files.append(file_name)
-                    
-                    if reference_files:
-                        st.markdown(
-                            f"""
-                            <div class="references-box">
-                                <b>References:</b><br>
-                                {"<br>".join([f"• {f}" for f in reference_files])}
-                            </div>
-                            """, 
-                            unsafe_allow_html=True
-                        )
+                if reference_files:
+                    st.markdown(_references_html(reference_files), unsafe_allow_html=True)
 
                 # Save to history
                 st.session_state.messages.append({
@@ -7,17 +7,24 @@ from langchain_core.messages import HumanMessage, AIMessage, SystemMessage
 from langchain.agents import create_agent
 from langchain.tools import BaseTool
 from langchain.agents.middleware import SummarizationMiddleware
+from pydantic import PrivateAttr
 # from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.checkpoint.sqlite import SqliteSaver
 
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from pathlib import Path
+import shutil
+import threading
+import time
+import weakref
 
 from src.config import Config
 from src.prompts.templates import PromptTemplate
 from src.chat_model import get_chat_model
-from src.loaders.document_loader import get_document_loader
+from src.loaders.document_loader import file_digest, get_document_loader
 from src.vectorstores.faiss_store import get_faiss_vector_store
+from src.vectorstores.semantic_cache import SemanticCache
+from src.utils.rwlock import ReadWriteLock
 from src.utils.logging_config import get_logger
 
 # Initialize logger
@@ -29,28 +36,108 @@ FAISS_INDEX_PATH = Config.FAISS_INDEX_PATH
 # Ensure directory exists
 FAISS_INDEX_PATH.mkdir(parents=True, exist_ok=True)
 
+# SQLite checkpointers keyed by session ID, one WAL connection per session. Entries
+# are weak, so a session's connection closes once no conversation chain uses it.
+_CHECKPOINTERS: "weakref.WeakValueDictionary[str, SqliteSaver]" = weakref.WeakValueDictionary()
+_CHECKPOINTERS_LOCK = threading.Lock()
+
+# Applied once per connection: fewer fsyncs, in-memory temp tables, mmap'd page reads, 64 MiB page cache
+_SQLITE_PRAGMAS = (
+    "PRAGMA journal_mode=WAL;",
+    "PRAGMA synchronous=NORMAL;",
+    "PRAGMA temp_store=MEMORY;",
+    "PRAGMA mmap_size=268435456;",
+    "PRAGMA cache_size=-65536;",
+)
+
+def get_checkpointer(session_id: str, resume: bool = True) -> SqliteSaver:
+    """
+    Get the short-term memory checkpointer for a session
+    
+    The first call for a session opens its database, keeping an existing one when
+    resuming and starting empty otherwise; later calls reuse the same connection so
+    SQLite's page cache stays warm. The connection is closed when the returned
+    checkpointer is garbage collected.
+    
+    Args:
+        session_id: Session ID
+        resume: Whether to keep an existing database for this session
+        
+    Returns:
+        SqliteSaver bound to the session's database
+    """
+    import sqlite3
+    
+    with _CHECKPOINTERS_LOCK:
+        checkpointer = _CHECKPOINTERS.get(session_id)
+        if checkpointer is None:
+            db_path = Config.SHORT_TERM_MEMORY / f"{session_id}.db"
+            if not (resume and db_path.exists()):
+                if not _CHECKPOINTERS:
+                    # No session open yet, drop all stale databases in one sweep
+                    shutil.rmtree(Config.SHORT_TERM_MEMORY, ignore_errors=True)
+                    Config.SHORT_TERM_MEMORY.mkdir(parents=True, exist_ok=True)
+                else:
+                    for file in (db_path, Path(f"{db_path}-wal"), Path(f"{db_path}-shm")):
+                        file.unlink(missing_ok=True)
+            
+            conn = sqlite3.connect(str(db_path), check_same_thread=False)
+            for pragma in _SQLITE_PRAGMAS:
+                conn.execute(pragma)
+            checkpointer = SqliteSaver(conn=conn)
+            weakref.finalize(checkpointer, conn.close)
+            _CHECKPOINTERS[session_id] = checkpointer
+        return checkpointer
+
 class RetrievalTool(BaseTool):
     """Tool for retrieving documents from vector store"""
     
     name: str = "retrieval_tool"
     description: str = "Retrieve relevant documents from knowledge base"
     retriever: Any = None  # Add retriever as Pydantic field
+    cache: Any = None  # Optional SemanticCache in front of the retriever
+    index_lock: Any = None  # ReadWriteLock of the vector store behind the retriever
     last_docs: List[Document] = []  # Store the most recent retrieved documents
+    _last_formatted: Optional[str] = PrivateAttr(default=None)  # Formatted output for last_docs
     
-    def __init__(self, retriever):
+    def __init__(self, retriever, index_lock: ReadWriteLock, cache: SemanticCache = None):
         """Initialize retrieval tool"""
-        super().__init__(retriever=retriever)  # Pass retriever via parameter
+        super().__init__(retriever=retriever, index_lock=index_lock, cache=cache)  # Pass retriever via parameter
+    
+    def _search_by_vector(self, embedding: List[float]) -> List[Document]:
+        """Run the retriever's search with an already computed query embedding"""
+        vector_store = self.retriever.vectorstore
+        if self.retriever.search_type == "mmr":
+            return vector_store.max_marginal_relevance_search_by_vector(embedding, **self.retriever.search_kwargs)
+        return vector_store.similarity_search_by_vector(embedding, **self.retriever.search_kwargs)
     
     def _run(self, query: str) -> str:
         """Execute retrieval operation"""
-        docs = self.retriever.invoke(query)
-        self.last_docs = docs  # Save retrieved documents
+        if self.cache is None:
+            with self.index_lock.read():
+                docs = self.retriever.invoke(query)
+        else:
+            # Embed once and reuse the vector for both the cache lookup and the search
+            embedding = self.cache.embeddings.embed_query(query)
+            docs = self.cache.lookup(embedding)
+            if docs is None:
+                # Cache the result before a writer can change the index and clear the cache
+                with self.index_lock.read():
+                    docs = self._search_by_vector(embedding)
+                    self.cache.add(embedding, docs)
         
         if not docs:
+            self.last_docs = docs
             return "No relevant documents found."
         
+        # Same document list as last call (e.g. a semantic cache hit), reuse its formatting
+        if docs is self.last_docs and self._last_formatted is not None:
+            return self._last_formatted
+        
         # Format documents
-        formatted_docs = "\n\n".join([f"<doc>\n{doc.page_content}\n</doc>" for doc in docs])
+        formatted_docs = "\n\n".join(f"<doc>\n{doc.page_content}\n</doc>" for doc in docs)
+        self.last_docs = docs  # Save retrieved documents
+        self._last_formatted = formatted_docs
         return formatted_docs
     
     def get_last_docs(self) -> List[Document]:
@@ -60,12 +147,23 @@ class RetrievalTool(BaseTool):
 class FAISSConversationalRAGChain:
     """FAISS-based Conversational RAG Chain using Agent implementation"""
     
-    def __init__(self, session_id: str = "default"):
+    # Retriever warm-up runs once per process
+    _warmed: bool = False
+    _warmup_lock = threading.Lock()
+    
+    # Every session shares the FAISS store, so updates to it and the query cache
+    # in front of it are process-wide as well. This lock serializes writers with
+    # their document bookkeeping, searches only take the store's read lock.
+    _index_lock = threading.Lock()
+    _semantic_cache: Optional[SemanticCache] = None
+    
+    def __init__(self, session_id: str = "default", resume: bool = True):
         """
         Initialize
         
         Args:
             session_id: Session ID
+            resume: Whether to resume the session's saved short-term memory
         """
         self.session_id = session_id
         
@@ -85,17 +183,13 @@ class FAISSConversationalRAGChain:
         # Get prompt
         self.prompt_template = PromptTemplate.template
         
-        # Create retrieval tool
-        self.retrieval_tool = RetrievalTool(self.retriever)
+        # Create retrieval tool with a semantic cache for repeated queries
+        with self._index_lock:
+            if FAISSConversationalRAGChain._semantic_cache is None:
+                FAISSConversationalRAGChain._semantic_cache = SemanticCache(self.faiss_store.embeddings)
+        self.retrieval_tool = RetrievalTool(self.retriever, self.faiss_store.lock, self._semantic_cache)
         
         logger.info(f"Initializing conversation chain for session: {self.session_id}")
-        import sqlite3
-        
-        for file in Path(Config.SHORT_TERM_MEMORY).rglob("*"):
-            if file.is_file():  
-                file.unlink(missing_ok=True) 
-        conn=sqlite3.connect(str(Config.SHORT_TERM_MEMORY/ f"{self.session_id}.db"), check_same_thread=False)
-        conn.execute("PRAGMA journal_mode=WAL;")
 
         from src.memory.long_term_memory import retrieve_similar_history_middleware,save_assistant_response_middleware,save_user_messages_middleware,sanitize_dangling_tool_middleware
         # Create agent with middleware for summarization
@@ -116,35 +210,98 @@ class FAISSConversationalRAGChain:
             ],
             
             # Use SqliteSaver instead of AsyncSqliteSaver to avoid event loop issues
-            checkpointer = SqliteSaver(conn=conn),
+            checkpointer = get_checkpointer(self.session_id, resume),
         )
+        
+        self._start_warmup()
+    
+    def _start_warmup(self):
+        """Start retriever warm-up in a background thread if it has not run yet"""
+        with FAISSConversationalRAGChain._warmup_lock:
+            if FAISSConversationalRAGChain._warmed:
+                return
+            FAISSConversationalRAGChain._warmed = True
+        threading.Thread(target=self._warmup, name="retriever-warmup", daemon=True).start()
+    
+    def _warmup(self):
+        """
+        Run a throwaway query so the first real search does not pay cold-start costs
+        
+        This opens the embedding API connection (or pages in local model weights)
+        and touches the FAISS index pages.
+        """
+        start = time.perf_counter()
+        try:
+            with self.faiss_store.lock.read():
+                self.retriever.invoke("hello")
+            logger.info(f"✅ Retriever warm-up finished in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            logger.warning(f"⚠️ Retriever warm-up failed: {e}")
     
     
  
-    from streamlit.runtime.uploaded_file_manager import UploadedFile
-    def add_documents(self, file_path: UploadedFile):
+    def add_documents(self, file_path: Path, file_name: Optional[str] = None):
         """
         Add documents to vector store
         
         Args:
-            file_path: File path
+            file_path: Path of the file on disk
+            file_name: Original file name, defaults to the name of file_path
         """
-        # file_path = self.document_loader.save_uploaded_file(file_path)
-        # Convert string path to Path object
-        # path = Path(file_path)
+        file_name = file_name or file_path.name
+        
+        # Identical content already indexed (possibly under another name): skip file I/O and chunking
+        doc_id = file_digest(file_path)
+        existing = self.document_loader.get_processed_filename(doc_id)
+        if existing is not None:
+            logger.info(f"Skipping duplicate upload {file_name}, content already indexed as {existing}")
+            return {"message": f"Skipping duplicate file: {file_name} has the same content as {existing}"}
         
         # Process file
-        chunks = self.document_loader._process_file(file_path=file_path, skip_processed=True)
+        chunks = self.document_loader._process_file(
+            file_path=file_path, skip_processed=True, file_name=file_name, doc_id=doc_id
+        )
         
         if not chunks:
-            logger.warning(f"⚠️ File {file_path.name} did not generate any document chunks after processing")
-            return {"message": f"Skipping already processed file:  {file_path.name} "}
+            logger.warning(f"⚠️ File {file_name} did not generate any document chunks after processing")
+            return {"message": f"Skipping already processed file:  {file_name} "}
         
-        # Use FAISS vector store service to add documents
-        self.faiss_store.add_documents(chunks)
+        self._index_chunks(chunks)
+    
+    def add_document_batch(self, files: List[Tuple[Path, str]]):
+        """
+        Add several documents to vector store, parsing them in parallel
         
-        # Update retriever
-        self.retriever = self.faiss_store.get_retriever()
+        Args:
+            files: (path of the file on disk, original file name) pairs
+        """
+        chunks = self.document_loader.batch_ingest(
+            [file_path for file_path, _ in files], file_names=[file_name for _, file_name in files]
+        )
+        
+        if not chunks:
+            file_names = ", ".join(file_name for _, file_name in files)
+            logger.warning(f"⚠️ Files {file_names} did not generate any document chunks after processing")
+            return {"message": f"Skipping already processed files: {file_names}"}
+        
+        self._index_chunks(chunks)
+    
+    def _index_chunks(self, chunks: List[Document]) -> None:
+        """
+        Add document chunks to vector store and refresh the retriever
+        
+        Args:
+            chunks: Document chunks to index
+        """
+        with self._index_lock:
+            # Use FAISS vector store service to add documents
+            self.faiss_store.add_documents(chunks)
+            
+            # Update retriever and drop cached results that predate the new documents
+            self.retriever = self.faiss_store.get_retriever()
+            self.retrieval_tool.retriever = self.retriever
+            with self.faiss_store.lock.write():
+                self.retrieval_tool.cache.clear()
     
     def  delete_documents(self, doc_id: str):
         """
@@ -154,35 +311,17 @@ class FAISSConversationalRAGChain:
             doc_id: Document ID
 
         """
-        self.document_loader.delete_processed_document(doc_id)
-        self.faiss_store.delete_by_source(doc_id)
+        with self._index_lock:
+            self.document_loader.delete_processed_document(doc_id)
+            self.faiss_store.delete_by_source(doc_id)
+            with self.faiss_store.lock.write():
+                self.retrieval_tool.cache.clear()
     
     def clear_documents(self):
         """Clear documents and conversation history"""
         # Clear documents from knowledge base
-        self.document_loader.clear_all_processed_documents()
-        self.faiss_store.clear()
-
-# Session management
-_sessions = {}
-
-def get_conversational_chain(session_id: str) -> FAISSConversationalRAGChain:
-    """Get or create conversation Chain"""
-    import asyncio
-    
-    # Ensure we have an event loop
-    try:
-        loop = asyncio.get_event_loop()
-    except RuntimeError:
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-    
-    if session_id not in _sessions:
-        _sessions[session_id] = FAISSConversationalRAGChain(session_id)
-    return _sessions[session_id]
-
-def clear_session(session_id: str):
-    """Clear session"""
-    if session_id in _sessions:
-        _sessions[session_id].clear_memory()
-        del _sessions[session_id]
+        with self._index_lock:
+            self.document_loader.clear_all_processed_documents()
+            self.faiss_store.clear()
+            with self.faiss_store.lock.write():
+                self.retrieval_tool.cache.clear()
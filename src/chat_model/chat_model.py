@@ -1,6 +1,7 @@
 """
 Chat Model Management
 """
+from functools import lru_cache
 from langchain_anthropic import ChatAnthropic
 from typing import Optional
 from src.config import Config
@@ -9,6 +10,29 @@ from src.utils.logging_config import get_logger
 # Initialize logger
 logger = get_logger(__name__)
 
+@lru_cache(maxsize=8)
+def _create_chat_model(
+    model: str,
+    api_key: Optional[str],
+    base_url: Optional[str],
+    temperature: float,
+    max_tokens: int
+) -> ChatAnthropic:
+    """
+    Create chat model instance, cached per fully resolved configuration
+    
+    Returns:
+        ChatAnthropic instance
+    """
+    logger.info(f"Initializing chat model: {model}")
+    return ChatAnthropic(
+        model=model,
+        anthropic_api_key=api_key,
+        base_url=base_url,
+        temperature=temperature,
+        max_tokens=max_tokens,
+    )
+
 def get_chat_model(
     model: Optional[str] = None,
     api_key: Optional[str] = None,
@@ -19,6 +43,8 @@ def get_chat_model(
     """
     Get chat model instance
     
+    Calls with the same resolved configuration share one instance (and its HTTP connection pool).
+    
     Args:
         model: Model name, defaults to the one in configuration
         api_key: API key, defaults to the one in configuration
@@ -29,20 +55,14 @@ def get_chat_model(
     Returns:
         ChatAnthropic instance
     """
-    # Create ChatAnthropic instance
-    logger.info(f"Initializing chat model: {model or Config.ANTHROPIC_MODEL_NAME}")
-    chat_model = ChatAnthropic(
+    # Resolve defaults first so equivalent calls hit the same cache entry
+    return _create_chat_model(
         model=model or Config.ANTHROPIC_MODEL_NAME,
-        anthropic_api_key=api_key or Config.ANTHROPIC_API_KEY,
+        api_key=api_key or Config.ANTHROPIC_API_KEY,
         base_url=base_url or Config.ANTHROPIC_BASE_URL,
         temperature=temperature if temperature is not None else Config.TEMPERATURE,
         max_tokens=max_tokens or Config.MAX_TOKENS,
     )
-    
-    return chat_model
-
-# Global singleton
-_chat_model = None
 
 def get_chat_model_singleton() -> ChatAnthropic:
     """
@@ -51,7 +71,4 @@ def get_chat_model_singleton() -> ChatAnthropic:
     Returns:
         ChatAnthropic singleton instance
     """
-    global _chat_model
-    if _chat_model is None:
-        _chat_model = get_chat_model()
-    return _chat_model
+    return get_chat_model()
@@ -17,6 +17,7 @@ class Config:
     FAISS_INDEX_PATH = DATA_DIR / "faiss_index"
     PROCESSED_DOCS_RECORD = DATA_DIR / "processed_docs.txt"
     LONG_TERM_MEMORY = DATA_DIR / "long_term_memory"
+    EMBEDDING_CACHE_DIR = DATA_DIR / "emb_cache"
     SHORT_TERM_MEMORY = DATA_DIR / "short_term_memory"
     LOG_DIR = BASE_DIR / "logs"
     LOG_FILE = LOG_DIR / "app.log"
@@ -31,6 +32,13 @@ class Config:
     OPENAI_API_KEY = os.getenv("OPENAI_EMBEDDING_API_KEY")
     OPENAI_BASE_URL = os.getenv("OPENAI_EMBEDDING_BASE_URL")
     OPENAI_EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL_NAME", "Qwen3-Embedding-4B")
+    EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "512"))  # Texts per embedding request
+    
+    # Embedding backend: "openai" (remote API) or "local" (sentence-transformers, no network round-trip)
+    EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "openai").lower()
+    LOCAL_EMBEDDING_MODEL = os.getenv("LOCAL_EMBEDDING_MODEL_NAME", "all-MiniLM-L6-v2")
+    EMBED_DIM = int(os.getenv("EMBED_DIM", "0"))  # Embedding dimension, 0 probes the model once when creating an empty index
+    EMBED_WORKERS = int(os.getenv("EMBED_WORKERS", "1"))  # Threads embedding shards concurrently, 1 disables
     
     # General configuration
     TEMPERATURE = float(os.getenv("TEMPERATURE", "0.7"))
@@ -39,10 +47,33 @@ class Config:
     # Retrieval configuration
     TOP_K = 5
     SIMILARITY_THRESHOLD = 0.7
-    
+
+    # FAISS index configuration (HNSW approximate nearest neighbour search)
+    # "HNSW" uses the tunables below, any other value is a faiss.index_factory key such as "IVF1024,PQ32"
+    FAISS_INDEX_TYPE = os.getenv("FAISS_INDEX_TYPE", "HNSW")
+    # Similarity metric: "cosine" (unit-normalized vectors, inner product) or "l2"
+    FAISS_METRIC = os.getenv("FAISS_METRIC", "cosine").lower()
+    FAISS_HNSW_M = int(os.getenv("FAISS_HNSW_M", "32"))
+    FAISS_HNSW_EF_CONSTRUCTION = int(os.getenv("FAISS_HNSW_EF_CONSTRUCTION", "200"))
+    FAISS_HNSW_EF_SEARCH = int(os.getenv("FAISS_HNSW_EF_SEARCH", "64"))  # 0 calibrates against FAISS_TARGET_RECALL
+    FAISS_NPROBE = int(os.getenv("FAISS_NPROBE", "0"))  # IVF lists scanned per query, 0 calibrates against FAISS_TARGET_RECALL
+    FAISS_TARGET_RECALL = float(os.getenv("FAISS_TARGET_RECALL", "0.95"))
+    # HNSW vector storage: "fp32" (exact), "fp16" (half the memory, negligible recall loss) or "sq8" (quarter the memory, slight recall loss)
+    FAISS_QUANT = os.getenv("FAISS_QUANT", "fp16").lower()
+    # Memory-map the saved index read-only so worker processes share it through the page cache
+    FAISS_MMAP = os.getenv("FAISS_MMAP", "false").lower() == "true"
+    # Serve searches from GPU 0 when one is available, HNSW indexes stay on the CPU
+    FAISS_USE_GPU = os.getenv("FAISS_USE_GPU", "false").lower() == "true"
+
+    # Semantic query cache configuration
+    SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95"))
+    SEMANTIC_CACHE_TTL = int(os.getenv("SEMANTIC_CACHE_TTL", "1800"))  # seconds
+    SEMANTIC_CACHE_MAX_SIZE = int(os.getenv("SEMANTIC_CACHE_MAX_SIZE", "512"))
+
     # Chunking configuration
     CHUNK_SIZE = 1000
     CHUNK_OVERLAP = 200
+    LOAD_DOCS_WORKERS = int(os.getenv("LOAD_DOCS_WORKERS", str(max(1, (os.cpu_count() or 2) - 1))))  # Processes for batch ingestion
     
     # Memory configuration
     MAX_HISTORY_LENGTH = 20
@@ -59,6 +90,7 @@ class Config:
             cls.LOG_DIR,
             cls.LONG_TERM_MEMORY,
             cls.SHORT_TERM_MEMORY,
+            cls.EMBEDDING_CACHE_DIR,
         ]:
             dir_path.mkdir(parents=True, exist_ok=True)
 
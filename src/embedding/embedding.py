@@ -1,19 +1,141 @@
 """
 Embedding Model Management
 """
+import hashlib
+import io
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
 from langchain_openai import OpenAIEmbeddings
-from typing import Optional
 from src.config import Config
+from src.utils.async_io import save_many
 from src.utils.logging_config import get_logger
 
 # Initialize logger
 logger = get_logger(__name__)
 
+class CachedOpenAIEmbeddings(OpenAIEmbeddings):
+    """
+    OpenAIEmbeddings with an on-disk cache for document embeddings
+
+    Each text is keyed by the SHA-256 of the model name and text, so re-uploaded
+    documents and repeated chunks skip the embedding API entirely. Only the
+    knowledge base uses it, and clearing the knowledge base clears the cache.
+    """
+
+    cache_dir: Path = Config.EMBEDDING_CACHE_DIR
+
+    def _cache_path(self, text: str) -> Path:
+        """Get cache file path for a text"""
+        digest = hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{digest}.npy"
+
+    def embed_documents(self, texts: List[str], chunk_size: Optional[int] = None, **kwargs) -> List[List[float]]:
+        """
+        Embed documents, only sending cache misses to the API
+
+        Args:
+            texts: Texts to embed
+            chunk_size: Texts per API request, defaults to the instance chunk_size
+
+        Returns:
+            Embeddings aligned with texts
+        """
+        embeddings: List[Optional[List[float]]] = [None] * len(texts)
+        misses: Dict[str, List[int]] = {}
+
+        for i, text in enumerate(texts):
+            path = self._cache_path(text)
+            if path.is_file():
+                try:
+                    embeddings[i] = np.load(path).tolist()
+                    continue
+                except Exception as e:
+                    logger.warning(f"⚠️ Failed to read cached embedding {path.name}: {e}")
+            misses.setdefault(text, []).append(i)
+
+        if misses:
+            logger.info(f"Embedding {len(misses)} texts ({len(texts) - sum(map(len, misses.values()))} cached)")
+            miss_texts = list(misses)
+            new_embeddings = super().embed_documents(miss_texts, chunk_size=chunk_size, **kwargs)
+            pending = []
+            for text, embedding in zip(miss_texts, new_embeddings):
+                for i in misses[text]:
+                    embeddings[i] = embedding
+                buffer = io.BytesIO()
+                np.save(buffer, np.asarray(embedding, dtype=np.float32))
+                pending.append((self._cache_path(text), buffer.getvalue()))
+            
+            # Write all new cache entries in one batch
+            try:
+                self.cache_dir.mkdir(parents=True, exist_ok=True)
+                save_many(pending)
+            except Exception as e:
+                logger.warning(f"⚠️ Failed to cache embeddings: {e}")
+
+        return embeddings
+
+    def clear_cache(self) -> None:
+        """Delete all cached embeddings"""
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+        logger.info(f"Embedding cache cleared: {self.cache_dir}")
+
+class LocalEmbeddings(Embeddings):
+    """
+    Local sentence-transformers embeddings
+
+    Runs in-process, so queries and ingestion pay no network round-trip. Uses FP16
+    weights on CUDA; on CPU the model uses half of the available cores.
+    """
+
+    def __init__(self, model: Optional[str] = None, batch_size: int = 64):
+        """
+        Initialize local embedding model
+
+        Args:
+            model: sentence-transformers model name, defaults to the one in configuration
+            batch_size: Texts per forward pass
+        """
+        try:
+            import torch
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "EMBEDDING_BACKEND=local requires sentence-transformers: pip install sentence-transformers"
+            ) from e
+
+        model_name = model or Config.LOCAL_EMBEDDING_MODEL
+        logger.info(f"Initializing local embedding model: {model_name}")
+        self.batch_size = batch_size
+        self.model = SentenceTransformer(model_name)
+        if self.model.device.type == "cuda":
+            self.model.half()
+        else:
+            torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents"""
+        return self.model.encode(
+            texts,
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+        ).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query"""
+        return self.embed_documents([text])[0]
+
 def get_embeddings(
     model: Optional[str] = None,
     api_key: Optional[str] = None,
-    base_url: Optional[str] = None
-) -> OpenAIEmbeddings:
+    base_url: Optional[str] = None,
+    cache: bool = False
+) -> Union[OpenAIEmbeddings, LocalEmbeddings]:
     """
     Get embedding model instance
     
@@ -21,28 +143,35 @@ def get_embeddings(
         model: Model name, defaults to the one in configuration
         api_key: API key, defaults to the one in configuration
         base_url: API base URL, defaults to the one in configuration
+        cache: Whether to cache document embeddings on disk, for knowledge base ingestion
         
     Returns:
-        OpenAIEmbeddings instance
+        LocalEmbeddings when EMBEDDING_BACKEND is "local", otherwise CachedOpenAIEmbeddings
+        with cache and OpenAIEmbeddings without
     """
+    if Config.EMBEDDING_BACKEND == "local":
+        return LocalEmbeddings(model=model)
+    
     logger.info(f"Initializing embedding model: {model or Config.OPENAI_EMBEDDING_MODEL}")
-    return OpenAIEmbeddings(
+    embeddings_class = CachedOpenAIEmbeddings if cache else OpenAIEmbeddings
+    return embeddings_class(
         model=model or Config.OPENAI_EMBEDDING_MODEL,
         openai_api_key=api_key or Config.OPENAI_API_KEY,
-        base_url=base_url or Config.OPENAI_BASE_URL
+        base_url=base_url or Config.OPENAI_BASE_URL,
+        chunk_size=Config.EMBEDDING_BATCH_SIZE
     )
 
 # Global singleton
 _embeddings = None
 
-def get_embeddings_singleton() -> OpenAIEmbeddings:
+def get_embeddings_singleton() -> Union[CachedOpenAIEmbeddings, LocalEmbeddings]:
     """
-    Get embedding model singleton
+    Get the knowledge base's embedding model singleton
     
     Returns:
-        OpenAIEmbeddings singleton instance
+        Embedding model singleton instance, caching document embeddings on disk
     """
     global _embeddings
     if _embeddings is None:
-        _embeddings = get_embeddings()
+        _embeddings = get_embeddings(cache=True)
     return _embeddings
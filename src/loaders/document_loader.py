@@ -5,8 +5,19 @@ This module provides a unified document loading interface supporting multiple fi
 It handles document loading, chunking, metadata addition, and processing state tracking to avoid reprocessing the same document.
 """
 from pathlib import Path
+import atexit
+import hashlib
+import multiprocessing
 import os
-from typing import List, Optional, Dict, Any
+import re
+import shutil
+import threading
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import importlib
+from itertools import chain, islice
+from typing import Iterable, Iterator, List, Optional, Dict, Any, Tuple, Union
 from langchain_core.documents import Document
 from langchain_community.document_loaders import (
     PyPDFLoader,
@@ -14,6 +25,7 @@ from langchain_community.document_loaders import (
     TextLoader,
 )
 from src.config import Config
+from src.utils.async_io import read_many
 from src.utils.text_splitter import get_recursive_splitter
 from src.utils.logging_config import get_logger
 
@@ -23,6 +35,91 @@ logger = get_logger(__name__)
 # Path to file recording processed document identifiers
 PROCESSED_DOCS_RECORD = Config.PROCESSED_DOCS_RECORD
 
+# Documents (e.g. PDF pages) above which chunking is spread across the chunking process pool.
+# Splitting takes about 0.7 ms per page while starting the spawn pool takes about 3 s, so only
+# very long documents gain from it.
+PARALLEL_CHUNK_THRESHOLD = 1024
+
+# Documents per task sent to the chunking process pool
+CHUNK_SLICE_SIZE = 16
+
+# Slices in flight per chunking worker, bounding how many pages are read ahead of the workers
+CHUNK_SLICES_PER_WORKER = 2
+
+# Splitter owned by each pool worker process, None outside the pool
+_SPLITTER = None
+
+# Prefix of record lines marking a document as deleted ("-<TAB>doc_id")
+_TOMBSTONE_PREFIX = "-\t"
+
+# Rewrite the record once this many tombstones have accumulated
+_MAX_TOMBSTONES = 256
+
+# Extracts the file name from legacy records that stored an UploadedFile repr
+_LEGACY_NAME_RE = re.compile(r"name='([^']+)'")
+
+def _parse_record_line(line: str) -> Tuple[str, str]:
+    """
+    Parse a processed-docs record line
+    
+    Lines are "doc_id<TAB>filename"; legacy lines hold only the document ID.
+    
+    Args:
+        line: Record line
+    
+    Returns:
+        (doc_id, filename) tuple
+    """
+    doc_id, sep, filename = line.partition("\t")
+    if sep:
+        return doc_id, filename
+    match = _LEGACY_NAME_RE.search(doc_id) if "UploadedFile" in doc_id else None
+    return doc_id, match.group(1) if match else doc_id.split("/")[-1]
+
+def file_digest(file_path: Union[str, Path], buffer_size: int = 1 << 20) -> str:
+    """
+    Compute the BLAKE2b content digest used as a document ID, reading the file in fixed-size chunks
+    
+    Args:
+        file_path: File path
+        buffer_size: Read buffer size in bytes
+    
+    Returns:
+        32-character hex digest
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb", buffering=0) as f:
+        buffer = bytearray(buffer_size)
+        view = memoryview(buffer)
+        while n := f.readinto(buffer):
+            digest.update(view[:n])
+    return digest.hexdigest()
+
+def _load_single_document(file_path: str) -> List[Document]:
+    """
+    Load and chunk one file in a worker process
+    
+    Args:
+        file_path: File path
+    
+    Returns:
+        List of Document objects (chunked), empty if loading failed
+    """
+    try:
+        return get_document_loader().load_document(file_path)
+    except Exception as e:
+        logger.error(f"  ✗ Failed to load {file_path}: {e}")
+        return []
+
+def _chunk_worker_init() -> None:
+    """Build the splitter once per chunking worker process"""
+    global _SPLITTER
+    _SPLITTER = get_recursive_splitter()
+
+def _chunk_worker(documents: List[Document]) -> List[Document]:
+    """Split documents into chunks in a chunking worker process"""
+    return _SPLITTER.split_documents(documents)
+
 class DocumentLoaderService:
     """
     Document Loading Service
@@ -42,9 +139,125 @@ class DocumentLoaderService:
         ".md": TextLoader,
     }
     
+    # Loader factories by file type, with loader-specific arguments already bound
+    _loader_signatures = {
+        suffix: partial(loader_class, encoding="utf-8") if loader_class is TextLoader else loader_class
+        for suffix, loader_class in SUPPORTED_LOADERS.items()
+    }
+    
+    # Parser packages the loaders import on first use
+    _PARSER_MODULES = ("pypdf", "docx2txt")
+    
     def __init__(self):
         """Initialize document loader service, set up text splitter"""
         self.text_splitter = get_recursive_splitter()
+        
+        # Import parsers now so the first upload does not pay for it mid-request
+        for module in self._PARSER_MODULES:
+            try:
+                importlib.import_module(module)
+            except ImportError:
+                logger.debug(f"Parser module {module} not installed")
+        
+        # Process pool for parsing batches of files and chunking large documents, created on first use
+        self._process_pool: Optional[ProcessPoolExecutor] = None
+        
+        # In-memory copy of the processed-docs record (doc_id -> filename), reloaded when its mtime changes
+        self._processed_cache: Optional[Dict[str, str]] = None
+        self._processed_mtime = 0
+        # Deleted doc_ids whose tombstone lines are still in the record
+        self._tombstones: set = set()
+        # Append-only descriptor for the record, opened on first write
+        self._record_fd: Optional[int] = None
+        # Documents being stored and chunked, so a file uploaded twice at once is only processed once
+        self._in_flight: set = set()
+        self._in_flight_lock = threading.Lock()
+        atexit.register(self._close_record)
+    
+    def _append_record(self, line: str) -> None:
+        """Append a line to the processed-docs record through the persistent descriptor"""
+        if self._record_fd is None:
+            self._record_fd = os.open(PROCESSED_DOCS_RECORD, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        os.write(self._record_fd, line.encode("utf-8"))
+    
+    def flush_processed_record(self) -> None:
+        """Flush record appends to disk, called once per batch rather than per document"""
+        if self._record_fd is not None:
+            os.fsync(self._record_fd)
+    
+    def _close_record(self) -> None:
+        """Close the record descriptor, e.g. before the file is replaced"""
+        if self._record_fd is not None:
+            os.close(self._record_fd)
+            self._record_fd = None
+    
+    def _claim(self, doc_id: str) -> bool:
+        """
+        Reserve a document for processing until it is recorded
+        
+        Args:
+            doc_id: Document identifier (content digest)
+        
+        Returns:
+            False if the document is already processed or being processed
+        """
+        with self._in_flight_lock:
+            if doc_id in self._in_flight or self._is_document_processed(doc_id):
+                return False
+            self._in_flight.add(doc_id)
+            return True
+    
+    def _release(self, doc_ids: Iterable[str]) -> None:
+        """Drop the processing reservation of documents"""
+        with self._in_flight_lock:
+            self._in_flight.difference_update(doc_ids)
+    
+    def _record_mtime(self) -> int:
+        """Get the processed-docs record mtime, 0 if it does not exist yet"""
+        try:
+            return PROCESSED_DOCS_RECORD.stat().st_mtime_ns
+        except FileNotFoundError:
+            return 0
+    
+    def _load_processed_cache(self) -> Dict[str, str]:
+        """
+        Get the processed documents, only re-reading the record file after it changed
+        
+        Returns:
+            Dictionary mapping doc_id to filename, in record order
+        """
+        mtime = self._record_mtime()
+        if self._processed_cache is None or mtime != self._processed_mtime:
+            records = {}
+            tombstones = set()
+            if mtime:
+                # Stream the record line by line rather than materializing the whole file and a list of lines
+                with open(PROCESSED_DOCS_RECORD, "r", encoding="utf-8", buffering=1 << 20) as f:
+                    for line in f:
+                        line = line.rstrip("\n")
+                        if line.startswith(_TOMBSTONE_PREFIX):
+                            doc_id = line[len(_TOMBSTONE_PREFIX):]
+                            records.pop(doc_id, None)
+                            tombstones.add(doc_id)
+                        elif line:
+                            doc_id, filename = _parse_record_line(line)
+                            records[doc_id] = filename
+            self._processed_cache = records
+            self._processed_mtime = mtime
+            self._tombstones = tombstones
+        return self._processed_cache
+    
+    def _compact_record(self) -> None:
+        """Rewrite the processed-docs record without tombstones, atomically replacing the old file"""
+        records = self._load_processed_cache()
+        tmp_path = PROCESSED_DOCS_RECORD.with_name(f"{PROCESSED_DOCS_RECORD.name}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.writelines(f"{record_id}\t{filename}\n" for record_id, filename in records.items())
+        # The old file is unlinked by the replace, reopen on the next append
+        self._close_record()
+        os.replace(tmp_path, PROCESSED_DOCS_RECORD)
+        self._tombstones.clear()
+        self._processed_mtime = self._record_mtime()
     
     def load_document(self, file_path: str) -> List[Document]:
         """
@@ -62,108 +275,341 @@ class DocumentLoaderService:
         path = Path(file_path)
         suffix = path.suffix.lower()
         
-        # Check if file type is supported
-        if suffix not in self.SUPPORTED_LOADERS:
+        # Get appropriate loader
+        create_loader = self._loader_signatures.get(suffix)
+        if create_loader is None:
             raise ValueError(f"Unsupported file type: {suffix}, supported types: {list(self.SUPPORTED_LOADERS.keys())}")
         
-        # Get appropriate loader class
-        loader_class = self.SUPPORTED_LOADERS[suffix]
-        
         # Create loader instance
-        loader_kwargs = {"encoding": "utf-8"} if loader_class == TextLoader else {}
-        loader = loader_class(str(path), **loader_kwargs)
+        loader = create_loader(str(path))
         
-        # Load document
-        documents = loader.load()
+        # Load document lazily, pages are chunked as they are parsed instead of all being held first
+        return self._split_documents(loader.lazy_load(), path)
+    
+    def _split_documents(self, documents: Iterable[Document], path: Path) -> List[Document]:
+        """
+        Add file metadata to loaded documents and process them into chunks
         
-        # Add metadata
-        for doc in documents:
-            doc.metadata.update({
-                "source": str(path),
-                "file_name": path.name,
-                "file_type": suffix
-            })
+        Args:
+            documents: Documents loaded from the file, may be a lazy iterator
+            path: Source file path
+        
+        Returns:
+            List of Document objects (chunked)
+        """
+        # Add metadata as documents are consumed
+        metadata = {
+            "source": str(path),
+            "file_name": path.name,
+            "file_type": path.suffix.lower()
+        }
+        tagged = self._tag_documents(documents, metadata)
         
-        # Process into chunks
+        # Process into chunks, peeking far enough ahead to tell whether the pool is worth it
         logger.info(f"Processing document: {path.name}")
-        chunks = self.text_splitter.split_documents(documents)
+        head = list(islice(tagged, PARALLEL_CHUNK_THRESHOLD + 1))
+        if (
+            len(head) > PARALLEL_CHUNK_THRESHOLD
+            and Config.LOAD_DOCS_WORKERS > 1
+            and _SPLITTER is None  # not already inside a pool worker
+        ):
+            chunks = self._split_in_pool(chain(head, tagged))
+        else:
+            chunks = self.text_splitter.split_documents(chain(head, tagged))
         logger.info(f"Document split into {len(chunks)} chunks")
         return chunks
     
+    @staticmethod
+    def _tag_documents(documents: Iterable[Document], metadata: Dict[str, Any]) -> Iterator[Document]:
+        """Add file metadata to each document as it is yielded"""
+        for doc in documents:
+            doc.metadata.update(metadata)
+            yield doc
+    
+    def _get_process_pool(self) -> ProcessPoolExecutor:
+        """Get the worker process pool, starting it on first use"""
+        if self._process_pool is None:
+            # spawn rather than fork: the app process runs several threads
+            self._process_pool = ProcessPoolExecutor(
+                max_workers=Config.LOAD_DOCS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_chunk_worker_init,
+            )
+        return self._process_pool
+    
+    def _split_in_pool(self, documents: Iterable[Document]) -> List[Document]:
+        """
+        Split documents into chunks across the chunking process pool
+        
+        Documents are split independently, so contiguous slices are handed to
+        the workers as they are read and the results concatenated in order.
+        Only a few slices per worker are submitted at a time, so a lazily loaded
+        document is not read into memory far ahead of the workers.
+        
+        Args:
+            documents: Documents with metadata already added, may be a lazy iterator
+        
+        Returns:
+            List of Document objects (chunked)
+        """
+        pool = self._get_process_pool()
+        documents = iter(documents)
+        slices = iter(lambda: list(islice(documents, CHUNK_SLICE_SIZE)), [])
+        window = deque(
+            pool.submit(_chunk_worker, documents_slice)
+            for documents_slice in islice(slices, CHUNK_SLICES_PER_WORKER * Config.LOAD_DOCS_WORKERS)
+        )
+        chunks = []
+        while window:
+            chunks.extend(window.popleft().result())
+            documents_slice = next(slices, None)
+            if documents_slice is not None:
+                window.append(pool.submit(_chunk_worker, documents_slice))
+        return chunks
+    
+    def load_documents(self, file_paths: List[str]) -> List[Document]:
+        """
+        Load multiple documents and process them into chunks
+        
+        Plain-text files are read in a single batch (io_uring on Linux when available)
+        and split straight from memory; other formats go through their loaders.
+        Files that fail to load or decode are logged and skipped.
+        
+        Args:
+            file_paths: List of file paths
+        
+        Returns:
+            List of Document objects (chunked) for all files that loaded
+        
+        Raises:
+            ValueError: When a file type is not supported
+        """
+        paths = [Path(p) for p in file_paths]
+        for path in paths:
+            if path.suffix.lower() not in self.SUPPORTED_LOADERS:
+                raise ValueError(f"Unsupported file type: {path.suffix.lower()}, supported types: {list(self.SUPPORTED_LOADERS.keys())}")
+        
+        text_paths = [p for p in paths if self.SUPPORTED_LOADERS[p.suffix.lower()] is TextLoader]
+        contents = dict(zip(text_paths, read_many(text_paths)))
+        
+        chunks = []
+        for path in paths:
+            try:
+                if path in contents:
+                    documents = [Document(page_content=contents[path].decode("utf-8"), metadata={})]
+                    chunks.extend(self._split_documents(documents, path))
+                else:
+                    chunks.extend(self.load_document(str(path)))
+            except UnicodeDecodeError as e:
+                logger.error(f"  ✗ Failed to load {path}: not valid UTF-8 text ({e})")
+            except Exception as e:
+                logger.error(f"  ✗ Failed to load {path}: {e}")
+        return chunks
+    
+    def batch_ingest(
+        self,
+        file_paths: List[Union[str, Path]],
+        file_names: Optional[List[str]] = None,
+        skip_processed: bool = True
+    ) -> List[Document]:
+        """
+        Load many files in parallel across a process pool
+        
+        Files are kept in the documents directory like single uploads. Plain-text
+        files are then read in one batch through load_documents, while PDF and Word
+        parsing, which are CPU-bound, are spread over the loader's process pool. Files are
+        recorded as processed here in the parent process so the record file is
+        only ever appended from one place.
+        
+        Args:
+            file_paths: Paths of the files on disk
+            file_names: Original file names, aligned with file_paths, default to the path names
+            skip_processed: Whether to skip already processed documents
+        
+        Returns:
+            List of Document objects (chunked) for all files
+        """
+        file_names = file_names or [Path(p).name for p in file_paths]
+        
+        # Store each distinct new file under its content digest
+        files: Dict[str, Tuple[Path, str]] = {}
+        claimed: List[str] = []
+        try:
+            for file_path, file_name in zip(file_paths, file_names):
+                doc_id = file_digest(file_path)
+                if doc_id in files or (skip_processed and not self._claim(doc_id)):
+                    logger.info(f"Skipping already processed file: {file_name} ({doc_id})")
+                    continue
+                if skip_processed:
+                    claimed.append(doc_id)
+                files[doc_id] = (self._store_file(Path(file_path), doc_id, file_name), file_name)
+            if not files:
+                return []
+            
+            # Chunks carry their stored path as source, which maps them back to their file
+            source_ids = {str(path): doc_id for doc_id, (path, _) in files.items()}
+            text_paths = [p for p in source_ids if self.SUPPORTED_LOADERS.get(Path(p).suffix.lower()) is TextLoader]
+            paths = [p for p in source_ids if p not in text_paths]
+            loaded = self.load_documents(text_paths) if text_paths else []
+            
+            if paths:
+                logger.info(f"Ingesting {len(paths)} files")
+                if len(paths) > 1 and Config.LOAD_DOCS_WORKERS > 1:
+                    results = self._get_process_pool().map(_load_single_document, paths)
+                else:
+                    results = [_load_single_document(p) for p in paths]
+                loaded.extend(chain.from_iterable(results))
+            
+            chunks_by_doc: Dict[str, List[Document]] = {}
+            for chunk in loaded:
+                chunks_by_doc.setdefault(source_ids[chunk.metadata["source"]], []).append(chunk)
+            
+            chunks = []
+            for doc_id, (_, file_name) in files.items():
+                file_chunks = chunks_by_doc.get(doc_id)
+                if file_chunks:
+                    for chunk in file_chunks:
+                        chunk.metadata.update({"doc_id": doc_id, "file_name": file_name})
+                    self._record_processed_document(doc_id, file_name)
+                    chunks.extend(file_chunks)
+            self.flush_processed_record()
+            logger.info(f"✅ Batch ingestion finished: {len(chunks)} chunks")
+            return chunks
+        finally:
+            self._release(claimed)
 
-    from streamlit.runtime.uploaded_file_manager import UploadedFile
-    def _process_file(self, file_path : UploadedFile, skip_processed: bool) -> List[Document]:
+    def _process_file(
+        self,
+        file_path: Path,
+        skip_processed: bool,
+        file_name: Optional[str] = None,
+        doc_id: Optional[str] = None
+    ) -> List[Document]:
         """
         Process a single file
         
         Args:
-            file_path: File path
+            file_path: Path of the file on disk
             skip_processed: Whether to skip already processed documents
+            file_name: Original file name, defaults to the name of file_path
+            doc_id: Content digest of the file, computed if not provided
         
         Returns:
             List of Document objects (chunked)
         """
-        # Use only the filename as the document ID
-        doc_id = file_path.name
-        if skip_processed and self._is_document_processed(doc_id):
-            logger.info(f"Skipping already processed file: {doc_id}")
-            return []
         if file_path is None:
             error_msg = "No upload file provided"
             logger.error(error_msg)
             raise ValueError(error_msg)
-            
-        # Ensure documents directory exists
-        Config.DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
-        
-        # Create target file path
-        file_path1 = Config.DOCUMENTS_DIR / file_path.name
-        
-        # Save file
-        with open(file_path1, "wb") as f:
-            f.write(file_path.getbuffer())
         
-        logger.info(f"✓ Uploaded file saved to: {file_path1}")
+        file_path = Path(file_path)
+        file_name = file_name or file_path.name
+        # Use the content digest as the document ID, so renamed copies are skipped and edited files are not
+        doc_id = doc_id or file_digest(file_path)
+        if skip_processed and not self._claim(doc_id):
+            logger.info(f"Skipping already processed file: {file_name} ({doc_id})")
+            return []
         
-        logger.info(f"Loading file: {file_path1.name}")
         try:
+            file_path1 = self._store_file(file_path, doc_id, file_name)
+            
+            logger.info(f"Loading file: {file_path1.name}")
             # Load and process document
             chunks = self.load_document(str(file_path1))
+            for chunk in chunks:
+                chunk.metadata.update({"doc_id": doc_id, "file_name": file_name})
             
             # Record processed document
-            self._record_processed_document(doc_id)
+            self._record_processed_document(doc_id, file_name)
             logger.info(f"  ✓ Success: {len(chunks)} chunks")
             
             return chunks
         except Exception as e:
             logger.error(f"  ✗ Failed: {e}")
             return []
+        finally:
+            if skip_processed:
+                self._release([doc_id])
+    
+    def _store_file(self, file_path: Path, doc_id: str, file_name: str) -> Path:
+        """
+        Keep a file in the documents directory under its stored path
+        
+        Args:
+            file_path: Path of the file on disk
+            doc_id: Content digest of the file
+            file_name: Original file name
+        
+        Returns:
+            Stored path of the file
+        """
+        # Ensure documents directory exists
+        Config.DOCUMENTS_DIR.mkdir(parents=True, exist_ok=True)
+        
+        # Create target file path, named by ID so files sharing a name do not overwrite each other
+        stored_path = self._stored_path(doc_id, file_name)
+        
+        # Move files already in the documents directory (e.g. streamed uploads), copy anything else
+        if file_path.resolve() != stored_path.resolve():
+            if file_path.parent.resolve() == Config.DOCUMENTS_DIR.resolve():
+                os.replace(file_path, stored_path)
+            else:
+                shutil.copyfile(file_path, stored_path)
+        
+        logger.info(f"✓ Uploaded file saved to: {stored_path}")
+        return stored_path
+    
+    def _stored_path(self, doc_id: str, filename: str) -> Path:
+        """
+        Get where a document is kept in the documents directory
+        
+        Args:
+            doc_id: Document identifier
+            filename: Original file name
+        
+        Returns:
+            Path named by document ID; records from before content IDs keep the original file name
+        """
+        if doc_id == filename:
+            return Config.DOCUMENTS_DIR / filename
+        return Config.DOCUMENTS_DIR / f"{doc_id}{Path(filename).suffix.lower()}"
+    
+    def get_processed_filename(self, doc_id: str) -> Optional[str]:
+        """
+        Get the original file name of a processed document
+        
+        Args:
+            doc_id: Document identifier
+        
+        Returns:
+            File name, or None if the document has not been processed
+        """
+        return self._load_processed_cache().get(doc_id)
     
     def _is_document_processed(self, doc_id: str) -> bool:
         """
         Check if document has already been processed (to avoid duplicates)
         
         Args:
-            doc_id: Document identifier (typically file path)
+            doc_id: Document identifier (content digest)
         
         Returns:
             Whether it has been processed
         """
-        if not PROCESSED_DOCS_RECORD.exists():
-            return False
-        with open(PROCESSED_DOCS_RECORD, "r", encoding="utf-8") as f:
-            processed_ids = f.read().splitlines()
-        return doc_id in processed_ids
+        return doc_id in self._load_processed_cache()
     
-    def _record_processed_document(self, doc_id: str) -> None:
+    def _record_processed_document(self, doc_id: str, filename: Optional[str] = None) -> None:
         """
         Record processed document identifier
         
         Args:
-            doc_id: Document identifier (typically file path)
+            doc_id: Document identifier (content digest)
+            filename: Display file name, defaults to doc_id
         """
-        with open(PROCESSED_DOCS_RECORD, "a", encoding="utf-8") as f:
-            f.write(f"{doc_id}\n")
+        cache = self._load_processed_cache()
+        self._append_record(f"{doc_id}\t{filename or doc_id}\n")
+        cache[doc_id] = filename or doc_id
+        self._processed_mtime = self._record_mtime()
     
     def batch_process_documents(self, documents: List[Document], batch_size: int = 10) -> List[List[Document]]:
         """
@@ -183,35 +629,40 @@ class DocumentLoaderService:
             logger.info(f"Created batch {len(batches)}: {len(batch)} documents")
         
         return batches
-    def list_all_processed_documents(self) -> List[str]:
+    def list_all_processed_documents(self) -> List[Tuple[str, str]]:
         """
         List all processed documents
         
         Returns:
-            List of processed document identifiers
+            List of (doc_id, filename) tuples
         """
-        if not PROCESSED_DOCS_RECORD.exists():
-            return []
-        with open(PROCESSED_DOCS_RECORD, "r", encoding="utf-8") as f:
-            processed_ids = f.read().splitlines()
-        return processed_ids
+        return list(self._load_processed_cache().items())
         
     def delete_processed_document(self, doc_id: str) -> None:
         """
         Delete a processed document from list of processed documents
+        
+        Appends a tombstone line instead of rewriting the record; the record is
+        compacted once enough tombstones have accumulated.
         """
-        if Path(Config.DOCUMENTS_DIR / doc_id).exists():
-            Path(Config.DOCUMENTS_DIR / doc_id).unlink()
+        records = self._load_processed_cache()
+        filename = records.pop(doc_id, None)
+        
+        file_path = self._stored_path(doc_id, filename or doc_id)
+        if file_path.exists():
+            file_path.unlink()
         else:
             logger.warning(f"Document not found: {doc_id}")
 
-        processed_ids = self.list_all_processed_documents()
-        if doc_id in processed_ids:
-            processed_ids.remove(doc_id)
-        else:
+        if filename is None:
             logger.warning(f"Document not found in list of processed documents: {doc_id}")
-        with open(PROCESSED_DOCS_RECORD, "w", encoding="utf-8") as f:
-            f.write("\n".join(processed_ids))
+            return
+        self._append_record(f"{_TOMBSTONE_PREFIX}{doc_id}\n")
+        self._tombstones.add(doc_id)
+        self._processed_mtime = self._record_mtime()
+        
+        if len(self._tombstones) > _MAX_TOMBSTONES:
+            self._compact_record()
 
     def clear_all_processed_documents(self) -> None:
         """
@@ -219,13 +670,21 @@ class DocumentLoaderService:
         """
         try:
             PROCESSED_DOCS_RECORD.open("w").close()
+            self._processed_cache = {}
+            self._tombstones.clear()
+            self._processed_mtime = self._record_mtime()
             logger.info(f"Successfully cleared {PROCESSED_DOCS_RECORD}")
         except Exception as e:
             logger.error(f"Failed to clear file contents of {PROCESSED_DOCS_RECORD}: {e}")
         try:
-            for file in Path(Config.DOCUMENTS_DIR).glob("*"):
-                if file.is_file():
-                    file.unlink(missing_ok=True)
+            # scandir reports the entry type from the directory listing, so no stat per file
+            with os.scandir(Config.DOCUMENTS_DIR) as entries:
+                for entry in entries:
+                    if entry.is_file(follow_symlinks=False):
+                        try:
+                            os.unlink(entry.path)
+                        except FileNotFoundError:
+                            pass
             logger.info(f"Successfully cleared {Config.DOCUMENTS_DIR}")
         except Exception as e:
             logger.error(f"Failed to clear directory {Config.DOCUMENTS_DIR}: {e}")
@@ -257,12 +716,13 @@ def is_document_processed(doc_id: str) -> bool:
     loader = get_document_loader()
     return loader._is_document_processed(doc_id)
 
-def record_processed_document(doc_id: str) -> None:
+def record_processed_document(doc_id: str, filename: Optional[str] = None) -> None:
     """
     Convenience function to record processed document
     
     Args:
         doc_id: Document identifier
+        filename: Display file name, defaults to doc_id
     """
     loader = get_document_loader()
-    loader._record_processed_document(doc_id)
+    loader._record_processed_document(doc_id, filename)
@@ -1,10 +1,25 @@
 from langchain_chroma import Chroma
+from langchain_core.documents import Document
+from langchain_core.messages import (
+    AIMessage,
+    AIMessageChunk,
+    HumanMessage,
+    HumanMessageChunk,
+    ToolMessage,
+    ToolMessageChunk,
+)
 from src.embedding import get_embeddings
 from src.config import Config
 # Ensure correct v1.0 components are imported
 from langchain.agents.middleware import before_model, after_model
+from collections import deque
 from datetime import datetime
+import atexit
 import hashlib
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 from src.utils.logging_config import get_logger
 
 # Initialize logger
@@ -14,13 +29,209 @@ logger = get_logger(__name__)
 chroma_store = Chroma(
     collection_name="conversation_history",
     embedding_function=get_embeddings(),
-    persist_directory=Config.LONG_TERM_MEMORY
+    persist_directory=Config.LONG_TERM_MEMORY,
+    # Only applied when the collection is first created
+    collection_metadata={"hnsw:space": "cosine", "hnsw:M": 16}
 )
 
+def _warm_up_chroma():
+    """Load the collection's HNSW index with a query on a stored vector, so the first real search is not cold"""
+    try:
+        sample = chroma_store._collection.peek(limit=1)
+        if len(sample["ids"]):
+            chroma_store._collection.query(query_embeddings=[sample["embeddings"][0]], n_results=1)
+        logger.info("✅ Long-term memory index warmed up")
+    except Exception as e:
+        logger.warning(f"⚠️ Long-term memory warm-up failed: {e}")
+
+threading.Thread(target=_warm_up_chroma, name="chroma-warmup", daemon=True).start()
+
+class _PendingMemory:
+    """
+    Write buffer for long-term memory
+    
+    Messages are queued on the request path and written to Chroma in one add_texts call,
+    so N messages share one embedding request and one Chroma write. The queue is flushed
+    when it reaches max_size, max_delay seconds after the first queued message, and at exit.
+    """
+    
+    def __init__(self, store: Chroma, max_size: int = 32, max_delay: float = 2.0):
+        self.store = store
+        self.max_size = max_size
+        self.max_delay = max_delay
+        # Keyed by message ID: a batch must not contain duplicate IDs
+        self._queue: Dict[str, Tuple[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._timer = None
+    
+    def enqueue(self, text: str, metadata: Dict[str, Any], msg_id: str) -> None:
+        """Queue a message for the next flush"""
+        with self._lock:
+            self._queue[msg_id] = (text, metadata)
+            if len(self._queue) < self.max_size:
+                if self._timer is None:
+                    self._timer = threading.Timer(self.max_delay, self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.flush()
+    
+    def flush(self) -> None:
+        """Write all queued messages to Chroma"""
+        with self._lock:
+            pending, self._queue = self._queue, {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+        
+        try:
+            self.store.add_texts(
+                texts=[text for text, _ in pending.values()],
+                metadatas=[metadata for _, metadata in pending.values()],
+                ids=list(pending)
+            )
+            _remember_saved(pending)
+            logger.info(f"Saved {len(pending)} messages to long-term memory")
+        except Exception as e:
+            logger.error(f"Failed to save {len(pending)} messages to long-term memory: {e}")
+
+_pending_memory = _PendingMemory(chroma_store)
+atexit.register(_pending_memory.flush)
+
+# (second, ISO timestamp) of the last formatted timestamp
+_TS_CACHE = (0, "")
+
+def _now_iso() -> str:
+    """Get the current time as an ISO string, formatted at most once per second"""
+    global _TS_CACHE
+    second = int(time.time())
+    if _TS_CACHE[0] != second:
+        _TS_CACHE = (second, datetime.now().isoformat())
+    return _TS_CACHE[1]
+
+class _QueryBatcher:
+    """
+    Read batcher for long-term memory
+    
+    Searches arriving within max_delay of each other are sent to Chroma as a single
+    query with several query embeddings, so concurrent sessions and tool-call fan-out
+    share one round-trip. A lone search waits at most max_delay before it is sent.
+    """
+    
+    def __init__(self, store: Chroma, max_delay: float = 0.01):
+        self.store = store
+        self.max_delay = max_delay
+        # Pending searches: (embedding, k, done event, [result or exception])
+        self._queue: List[Tuple[Sequence[float], int, threading.Event, list]] = []
+        self._lock = threading.Lock()
+        self._timer = None
+    
+    def search(self, embedding: Sequence[float], k: int) -> List[Document]:
+        """
+        Find the stored messages most similar to a query embedding
+        
+        Args:
+            embedding: Query embedding
+            k: Number of messages to return
+        
+        Returns:
+            Matching messages, most similar first
+        """
+        done, result = threading.Event(), []
+        with self._lock:
+            self._queue.append((embedding, k, done, result))
+            if self._timer is None:
+                self._timer = threading.Timer(self.max_delay, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+        done.wait()
+        if isinstance(result[0], Exception):
+            raise result[0]
+        return result[0]
+    
+    def flush(self) -> None:
+        """Run all pending searches, one Chroma query per distinct k"""
+        with self._lock:
+            pending, self._queue = self._queue, []
+            self._timer = None
+        
+        by_k: Dict[int, list] = {}
+        for request in pending:
+            by_k.setdefault(request[1], []).append(request)
+        
+        for k, requests in by_k.items():
+            try:
+                results = self.store._collection.query(
+                    query_embeddings=[list(embedding) for embedding, *_ in requests],
+                    n_results=k,
+                    include=["documents", "metadatas"],
+                )
+                for i, (_, _, done, result) in enumerate(requests):
+                    result.append([
+                        Document(page_content=text, metadata=metadata or {}, id=doc_id)
+                        for text, metadata, doc_id in zip(
+                            results["documents"][i], results["metadatas"][i], results["ids"][i]
+                        )
+                    ])
+                    done.set()
+            except Exception as e:
+                for _, _, done, result in requests:
+                    if not done.is_set():
+                        result.append(e)
+                        done.set()
+
+_query_batcher = _QueryBatcher(chroma_store)
+
+# Recently saved message IDs, so retried or repeated messages skip the write and its embedding call.
+# IDs are only remembered once written, a message from a failed flush is saved again when it repeats.
+_RECENT_IDS: deque = deque(maxlen=4096)
+_RECENT_IDS_SET: set = set()
+_RECENT_IDS_LOCK = threading.Lock()
+
+def _seen_recently(msg_id: str) -> bool:
+    """Check whether a message ID was saved recently"""
+    with _RECENT_IDS_LOCK:
+        return msg_id in _RECENT_IDS_SET
+
+def _remember_saved(msg_ids: Iterable[str]) -> None:
+    """Remember message IDs written to long-term memory"""
+    with _RECENT_IDS_LOCK:
+        for msg_id in msg_ids:
+            if msg_id in _RECENT_IDS_SET:
+                continue
+            if len(_RECENT_IDS) == _RECENT_IDS.maxlen:
+                _RECENT_IDS_SET.discard(_RECENT_IDS[0])
+            _RECENT_IDS.append(msg_id)
+            _RECENT_IDS_SET.add(msg_id)
+
 def generate_msg_id(content: str, role: str) -> str:
     """Generate content-based unique ID to prevent duplicate storage"""
-    raw = f"{role}:{content}"
-    return hashlib.md5(raw.encode('utf-8')).hexdigest()
+    raw = f"{role}:".encode('utf-8') + (content.encode('utf-8') if isinstance(content, str) else content)
+    return hashlib.blake2b(raw, digest_size=16).hexdigest()
+
+# Message kind by exact message class, one dict lookup instead of attribute probes
+_MSG_TYPE = {
+    HumanMessage: "human",
+    HumanMessageChunk: "human",
+    AIMessage: "ai",
+    AIMessageChunk: "ai",
+    ToolMessage: "tool",
+    ToolMessageChunk: "tool",
+}
+
+def _classify(msg) -> Optional[str]:
+    """Get a message's kind ("human", "ai" or "tool"), falling back to its role/type for other classes"""
+    kind = _MSG_TYPE.get(type(msg))
+    if kind is None:
+        kind = "human" if getattr(msg, "role", None) == "user" else getattr(msg, "type", None)
+    return kind
+
+@lru_cache(maxsize=1024)
+def _embed_query(query: str) -> Tuple[float, ...]:
+    """Embed a history query, cached so retries and repeated questions skip the embedding call"""
+    return tuple(chroma_store.embeddings.embed_query(query))
 
 # 1. Retrieval middleware
 @before_model
@@ -37,18 +248,20 @@ def retrieve_similar_history_middleware(state, runtime):
     last_msg = messages[-1]
     current_query = ""
     
-    # Compatibility check: Confirm it's a HumanMessage
-    if hasattr(last_msg, "type") and last_msg.type == "human":
-         current_query = last_msg.content
-    elif hasattr(last_msg, "content") and not hasattr(last_msg, "tool_calls"):
+    # Query with user input (or tool output on the follow-up call), never with the model's own tool calls
+    if _classify(last_msg) in ("human", "tool"):
          current_query = last_msg.content
 
+    # Handle List[content] (like multimodal input)
+    if isinstance(current_query, list):
+        current_query = " ".join(item["text"] for item in current_query if isinstance(item, dict) and "text" in item)
+
     if not current_query:
         return state
     
     # 2. Execute vector retrieval
     # print("Retrieving relevant conversation history...") # for debugging
-    results = chroma_store.similarity_search(current_query, k=3)
+    results = _query_batcher.search(_embed_query(current_query), k=3)
     
     if results:
         history_context = "\n".join([f"- {r.page_content}" for r in results])
@@ -81,10 +294,7 @@ def save_user_messages_middleware(state, runtime):
     last_msg = messages[-1]
     
     # Determine if it's a valid user text message
-    is_human = (hasattr(last_msg, "type") and last_msg.type == "human") or \
-               (hasattr(last_msg, "role") and last_msg.role == "user")
-               
-    if is_human and hasattr(last_msg, "content"):
+    if _classify(last_msg) == "human" and hasattr(last_msg, "content"):
         content = last_msg.content
         # Handle List[content] (like multimodal input)
         if isinstance(content, list):
@@ -95,12 +305,14 @@ def save_user_messages_middleware(state, runtime):
             try:
                 # ✅ Use ID to prevent duplication
                 msg_id = generate_msg_id(content, "user")
-                chroma_store.add_texts(
-                    texts=[content],
-                    metadatas=[{"role": "user", "timestamp": datetime.now().isoformat()}],
-                    ids=[msg_id] # Explicit deduplication: if ID already exists, will typically update or skip
+                if _seen_recently(msg_id):
+                    return state
+                _pending_memory.enqueue(
+                    content,
+                    {"role": "user", "timestamp": _now_iso()},
+                    msg_id # Explicit deduplication: if ID already exists, will typically update or skip
                 )
-                logger.info(f"User message saved to long-term memory with ID: {msg_id[:8]}...")
+                logger.info(f"User message queued for long-term memory with ID: {msg_id[:8]}...")
             except Exception as e:
                 logger.error(f"Failed to save user message: {e}")
     
@@ -130,20 +342,19 @@ def save_assistant_response_middleware(state, runtime):
     if content and isinstance(content, str) and content.strip():
         try:
             msg_id = generate_msg_id(content, "assistant")
-            chroma_store.add_texts(
-                texts=[content],
-                metadatas=[{"role": "assistant", "timestamp": datetime.now().isoformat()}],
-                ids=[msg_id]
+            if _seen_recently(msg_id):
+                return state
+            _pending_memory.enqueue(
+                content,
+                {"role": "assistant", "timestamp": _now_iso()},
+                msg_id
             )
-            logger.info(f"Assistant response saved to long-term memory with ID: {msg_id[:8]}...")
+            logger.info(f"Assistant response queued for long-term memory with ID: {msg_id[:8]}...")
         except Exception as e:
             logger.error(f"Failed to save model response: {e}")
             
     return state
 
-from langchain_core.messages import AIMessage, ToolMessage
-from langchain.agents.middleware import before_model
-
 @before_model
 def sanitize_dangling_tool_middleware(state, runtime):
     """
@@ -168,11 +379,8 @@ def sanitize_dangling_tool_middleware(state, runtime):
     last_msg = messages[-1]
     
     # Determine if it's an AI message and contains tool calls
-    # Note: Different versions of LangChain/Core may have slightly different attributes, compatibility is provided here
-    is_ai_msg = isinstance(last_msg, AIMessage)
-    has_tool_calls = hasattr(last_msg, "tool_calls") and last_msg.tool_calls
-    
-    if is_ai_msg and has_tool_calls:
+    # Note: Message classes from other LangChain/Core versions fall back to their type attribute in _classify
+    if _classify(last_msg) == "ai" and getattr(last_msg, "tool_calls", None):
         logger.warning(f"🚨 [Auto-fix] Detected dangling tool call (ID: {last_msg.id}), removing...")
         
         # 3. Execute removal operation
@@ -3,9 +3,16 @@ Logging Configuration Module
 
 This module provides centralized logging configuration for the entire application.
 It configures logging with both console and file handlers, with automatic log rotation.
+Records are handed to the handlers through a queue, so callers never block on console or
+file I/O; a single background listener thread does the actual writing.
 """
+import atexit
 import logging
 import logging.config
+import os
+import queue
+import threading
+from logging.handlers import QueueHandler, QueueListener
 from src.config import Config
 
 # Logging configuration
@@ -37,8 +44,35 @@ LOGGING_CONFIG = {
     },
 }
 
-# Configure logging
-logging.config.dictConfig(LOGGING_CONFIG)
+# Background listener feeding the configured handlers, started on first get_logger call
+_listener = None
+_handlers = []
+_configure_lock = threading.Lock()
+
+def _configure_logging():
+    """Apply LOGGING_CONFIG and move its root handlers behind a queue (runs once per process)"""
+    global _listener, _handlers
+    with _configure_lock:
+        if _listener is not None:
+            return
+        logging.config.dictConfig(LOGGING_CONFIG)
+        root = logging.getLogger()
+        _handlers = root.handlers[:]
+        log_queue = queue.SimpleQueue()
+        root.handlers = [QueueHandler(log_queue)]
+        _listener = QueueListener(log_queue, *_handlers, respect_handler_level=True)
+        _listener.start()
+        atexit.register(_listener.stop)
+
+def _restore_handlers_after_fork():
+    """Forked children have no listener thread, so log straight to the handlers"""
+    global _listener
+    if _listener is not None:
+        logging.getLogger().handlers = _handlers[:]
+        _listener = None
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restore_handlers_after_fork)
 
 def get_logger(name):
     """
@@ -50,4 +84,6 @@ def get_logger(name):
     Returns:
         Logger instance
     """
+    if _listener is None:
+        _configure_logging()
     return logging.getLogger(name)
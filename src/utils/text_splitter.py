@@ -1,6 +1,12 @@
 """
 Text Splitting Utilities
+
+Splitters are stateless once configured, so each getter returns a cached instance
+per (chunk_size, chunk_overlap) instead of building a new one on every call.
 """
+from functools import lru_cache
+from typing import Optional
+
 from langchain_text_splitters import (
     RecursiveCharacterTextSplitter,
     CharacterTextSplitter,
@@ -12,44 +18,64 @@ from src.utils.logging_config import get_logger
 # Initialize logger
 logger = get_logger(__name__)
 
-def get_recursive_splitter():
+@lru_cache(maxsize=4)
+def get_recursive_splitter(chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None):
     """
     Get recursive character splitter
     Suitable for most texts, attempts to split at natural boundaries like paragraphs and sentences
+    
+    Args:
+        chunk_size: Maximum chunk size, defaults to value in configuration
+        chunk_overlap: Overlap between chunks, defaults to value in configuration
     """
     return RecursiveCharacterTextSplitter(
-        chunk_size=Config.CHUNK_SIZE,
-        chunk_overlap=Config.CHUNK_OVERLAP,
+        chunk_size=chunk_size or Config.CHUNK_SIZE,
+        chunk_overlap=chunk_overlap if chunk_overlap is not None else Config.CHUNK_OVERLAP,
         separators=["\n\n", "\n", "。", "！", "？", ".", "!", "?", " ", ""],
         length_function=len,
     )
 
-def get_character_splitter():
+@lru_cache(maxsize=4)
+def get_character_splitter(chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None):
     """
     Get simple character splitter
     Suitable for simple texts, splits by character count
+    
+    Args:
+        chunk_size: Maximum chunk size, defaults to value in configuration
+        chunk_overlap: Overlap between chunks, defaults to value in configuration
     """
     return CharacterTextSplitter(
         separator="\n",
-        chunk_size=Config.CHUNK_SIZE,
-        chunk_overlap=Config.CHUNK_OVERLAP,
+        chunk_size=chunk_size or Config.CHUNK_SIZE,
+        chunk_overlap=chunk_overlap if chunk_overlap is not None else Config.CHUNK_OVERLAP,
         length_function=len,
     )
 
-def get_token_splitter(encoding_name="cl100k_base"):
+@lru_cache(maxsize=4)
+def get_token_splitter(encoding_name="cl100k_base", chunk_size: Optional[int] = None, chunk_overlap: Optional[int] = None):
     """
     Get token-based splitter
     Suitable for scenarios requiring precise token count control
     
     Args:
         encoding_name: Encoding name, defaults to OpenAI's cl100k_base
+        chunk_size: Maximum chunk size in tokens, defaults to value in configuration
+        chunk_overlap: Overlap between chunks, defaults to value in configuration
     """
     return TokenTextSplitter(
         encoding_name=encoding_name,
-        chunk_size=Config.CHUNK_SIZE,
-        chunk_overlap=Config.CHUNK_OVERLAP,
+        chunk_size=chunk_size or Config.CHUNK_SIZE,
+        chunk_overlap=chunk_overlap if chunk_overlap is not None else Config.CHUNK_OVERLAP,
     )
 
+# Splitter getters by type name
+_SPLITTERS = {
+    "recursive": get_recursive_splitter,
+    "character": get_character_splitter,
+    "token": get_token_splitter,
+}
+
 def split_text(text, splitter_type="recursive"):
     """
     Split text
@@ -62,15 +88,10 @@ def split_text(text, splitter_type="recursive"):
         List of text chunks after splitting
     """
     logger.info(f"Splitting text using {splitter_type} splitter")
-    if splitter_type == "recursive":
-        splitter = get_recursive_splitter()
-    elif splitter_type == "character":
-        splitter = get_character_splitter()
-    elif splitter_type == "token":
-        splitter = get_token_splitter()
-    else:
+    get_splitter = _SPLITTERS.get(splitter_type)
+    if get_splitter is None:
         error_msg = f"Unsupported splitter type: {splitter_type}"
         logger.error(error_msg)
         raise ValueError(error_msg)
     
-    return splitter.split_text(text)
+    return get_splitter().split_text(text)
@@ -4,29 +4,133 @@ FAISS Vector Store Management
 This module provides a unified management interface for FAISS vector storage, including creation, loading, updating, and querying.
 FAISS is an efficient vector similarity search library used to store document vector representations and perform fast retrieval.
 """
+import copy
+import json
+import os
+import pickle
+import shutil
 import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
 from pathlib import Path
-from typing import List, Optional, Dict, Any, Union
+from typing import List, Optional, Callable, Dict, Any, Iterator, Set, Tuple, Union
 import hashlib
 
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_core.documents import Document
 from langchain_core.embeddings import Embeddings
 from langchain_core.vectorstores import VectorStore
+from langchain_openai import OpenAIEmbeddings
 
 from src.config import Config
-from src.embedding import get_embeddings, get_embeddings_singleton
-from src.loaders.document_loader import get_document_loader
+from src.embedding import CachedOpenAIEmbeddings, get_embeddings, get_embeddings_singleton
+from src.utils.rwlock import ReadWriteLock
 from src.utils.logging_config import get_logger
 
 # Initialize logger
 logger = get_logger(__name__)
 
-# Vector store path
+# Vector store path, created on first save
 FAISS_INDEX_PATH = Config.FAISS_INDEX_PATH
 
-# Ensure directory exists
-FAISS_INDEX_PATH.mkdir(parents=True, exist_ok=True)
+# Files making up a saved vector store, index.pkl is the docstore format written by FAISS.save_local
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "index.json"
+LEGACY_DOCSTORE_FILE = "index.pkl"
+
+# Each save writes its files into a new generation directory named by the CURRENT pointer file
+CURRENT_FILE = "CURRENT"
+GENERATION_PREFIX = "gen-"
+
+# Scalar quantizer for each FAISS_QUANT setting, fp32 keeps full-precision vectors
+_SQ_TYPES = {
+    "fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+# FAISS metric and matching LangChain distance strategy for each FAISS_METRIC setting
+_METRICS = {
+    "cosine": (faiss.METRIC_INNER_PRODUCT, DistanceStrategy.MAX_INNER_PRODUCT),
+    "l2": (faiss.METRIC_L2, DistanceStrategy.EUCLIDEAN_DISTANCE),
+}
+
+# Vectors sampled to fit the per-dimension ranges of an 8-bit scalar quantizer
+SQ_TRAINING_SIZE = 1000
+
+# Source of random int64 FAISS labels for new vectors
+_LABEL_RNG = np.random.default_rng()
+
+# Search parameter calibration: stored vectors used as queries, neighbours compared
+# per query (MMR's default fetch_k) and candidate values tried in increasing cost
+CALIBRATION_QUERIES = 200
+CALIBRATION_K = 20
+NPROBE_CANDIDATES = (1, 2, 4, 8, 16, 32, 64, 128)
+EF_SEARCH_CANDIDATES = (16, 32, 64, 128, 256, 512)
+
+# Stored vectors decoded at a time while computing exact neighbours for calibration
+CALIBRATION_BLOCK_SIZE = 4096
+
+# Share of deleted vectors an HNSW index keeps before it is rebuilt without them
+TOMBSTONE_COMPACT_RATIO = 0.2
+
+# Matches every label except the -1 of deleted vectors
+_LIVE_LABELS = faiss.IDSelectorRange(0, np.iinfo(np.int64).max)
+
+class _LiveIndex:
+    """Labelled HNSW index whose searches skip deleted vectors"""
+    
+    def __init__(self, index: faiss.Index):
+        """
+        Wrap an index for searching
+        
+        Args:
+            index: IndexIDMap2 over an HNSW index
+        """
+        self._index = index
+    
+    def __getattr__(self, name: str) -> Any:
+        """Delegate everything but search to the wrapped index"""
+        return getattr(self._index, name)
+    
+    def search(self, x: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Search with a selector, so deleted vectors do not take result slots"""
+        ef_search = faiss.downcast_index(self._index.index).hnsw.efSearch
+        return self._index.search(x, k, params=faiss.SearchParametersHNSW(sel=_LIVE_LABELS, efSearch=ef_search))
+
+class _VectorStore(FAISS):
+    """
+    LangChain FAISS store whose HNSW index may still hold deleted vectors
+    
+    LangChain expects -1 labels only at the end of a result row, so searches
+    run on a view whose index filters deleted vectors out inside FAISS.
+    """
+    
+    def live_view(self) -> FAISS:
+        """
+        Get a store to search that never returns deleted vectors
+        
+        Returns:
+            This store, or a shallow copy searching through _LiveIndex while deleted vectors remain
+        """
+        if self.index.ntotal == len(self.index_to_docstore_id):
+            return self
+        view = copy.copy(self)
+        view.index = _LiveIndex(self.index)
+        return view
+    
+    def similarity_search_with_score_by_vector(self, *args, **kwargs) -> List[Tuple[Document, float]]:
+        """Search by vector through live_view, see FAISS.similarity_search_with_score_by_vector"""
+        return super(_VectorStore, self.live_view()).similarity_search_with_score_by_vector(*args, **kwargs)
+    
+    def max_marginal_relevance_search_with_score_by_vector(self, *args, **kwargs) -> List[Tuple[Document, float]]:
+        """MMR search by vector through live_view, see FAISS.max_marginal_relevance_search_with_score_by_vector"""
+        return super(_VectorStore, self.live_view()).max_marginal_relevance_search_with_score_by_vector(*args, **kwargs)
 
 class FAISSVectorStore:
     """FAISS Vector Store Management Class"""
@@ -39,41 +143,591 @@ class FAISSVectorStore:
             embeddings: Embedding model, defaults to global singleton
         """
         self.embeddings = embeddings or get_embeddings_singleton()
+        self._metric, self._distance_strategy = _METRICS[Config.FAISS_METRIC]
+        self._mmapped = False
+        self._dirty = False
+        self._bulk_depth = 0
+        self._retrievers = {}
+        self._gpu_resources = None
+        self._calibrated = {}
+        # Searches share the index, adds, deletes and saves hold it exclusively
+        self.lock = ReadWriteLock()
         self.vector_store = self._load_or_create_vector_store()
+        self._set_index(self.vector_store.index)
+        self._source_to_labels = self._index_sources()
+        self._saved_ntotal = self.vector_store.index.ntotal
     
     def _load_or_create_vector_store(self) -> FAISS:
         """
         Load or create FAISS vector store
         
-        If a saved vector store exists, load it; otherwise create an empty one.
+        If a saved vector store exists, load it; otherwise create an empty one
+        without embedding anything when EMBED_DIM is configured.
         
         Returns:
             FAISS vector store instance
+            
+        Raises:
+            RuntimeError: If a saved vector store exists but cannot be read
         """
         # Check if saved vector store exists
-        if FAISS_INDEX_PATH.exists() and any(FAISS_INDEX_PATH.iterdir()):
+        store_dir = self._current_dir(FAISS_INDEX_PATH)
+        if (store_dir / INDEX_FILE).is_file():
+            logger.info(f"✅ Loading existing vector store (path: {store_dir})")
             try:
-                logger.info(f"✅ Loading existing vector store (path: {FAISS_INDEX_PATH})")
-                vector_store = FAISS.load_local(
-                    folder_path=str(FAISS_INDEX_PATH),
-                    embeddings=self.embeddings,
-                    allow_dangerous_deserialization=True
-                )
-                return vector_store
+                vector_store = self._read_store(store_dir, mmap=Config.FAISS_MMAP)
             except Exception as e:
-                logger.warning(f"⚠️ Failed to load vector store: {e}, will create a new one")
+                # An empty store would replace the saved one on the next save, leave it for inspection instead
+                raise RuntimeError(f"Failed to load vector store from {store_dir}: {e}") from e
+            if not self._index_matches_config(vector_store.index):
+                # Migrate indexes persisted with a different index type
+                logger.info(f"Converting existing index to {Config.FAISS_INDEX_TYPE}")
+                labels = np.fromiter(vector_store.index_to_docstore_id, dtype=np.int64)
+                vector_store.index = self._reindex(vector_store.index, labels)
+                self._mmapped = False
+                if self._index_matches_config(vector_store.index):
+                    self._write_store(vector_store, FAISS_INDEX_PATH)
+            return vector_store
         
-        # If no documents, create an empty vector store
-        logger.warning("⚠️ No existing vector store found or loading failed, creating empty vector store")
-        vector_store = FAISS.from_texts(
-            ["初始化文档"], self.embeddings
+        # If no documents, create an empty vector store, it is saved once documents are added
+        logger.warning("⚠️ No existing vector store found, creating empty vector store")
+        dimension = Config.EMBED_DIM or len(self.embeddings.embed_query(" "))
+        return _VectorStore(
+            self.embeddings,
+            self._wrap(self._build_index(dimension)),
+            InMemoryDocstore(),
+            {},
+            distance_strategy=self._distance_strategy,
         )
-        vector_store.save_local(str(FAISS_INDEX_PATH))
-        return vector_store
+    
+    @staticmethod
+    def _source_of(id: str) -> str:
+        """
+        Get the source document ID from a chunk ID of the form sourceDocID_UUID
+        
+        Args:
+            id: Chunk ID
+            
+        Returns:
+            Source document ID
+        """
+        return id.rsplit("_", 1)[0]
+    
+    def _index_sources(self) -> Dict[str, Set[int]]:
+        """
+        Group FAISS labels in the vector store by source document
+        
+        Returns:
+            Mapping of source document ID to the labels of its chunks
+        """
+        source_to_labels = defaultdict(set)
+        for label, id in self.vector_store.index_to_docstore_id.items():
+            source_to_labels[self._source_of(id)].add(label)
+        return source_to_labels
+    
+    @staticmethod
+    def _current_dir(folder: Path) -> Path:
+        """
+        Get the directory holding the current saved generation of a vector store
+        
+        Args:
+            folder: Vector store directory
+            
+        Returns:
+            Generation directory named by the CURRENT pointer, or folder itself for
+            stores saved before generations
+        """
+        try:
+            return folder / (folder / CURRENT_FILE).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            return folder
+    
+    def _read_store(self, store_dir: Path, mmap: bool = False) -> FAISS:
+        """
+        Read a saved vector store
+        
+        With mmap the index is memory-mapped read-only, so the kernel pages it in
+        on demand and shares it between processes instead of each process reading
+        a private copy into memory. Stores saved by FAISS.save_local are read from
+        their pickled docstore until the next save rewrites them.
+        
+        Args:
+            store_dir: Directory holding the index and docstore files
+            mmap: Whether to memory-map the index file
+            
+        Returns:
+            FAISS vector store instance
+            
+        Raises:
+            ValueError: If the index and docstore hold different labels
+        """
+        flags = faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY if mmap else 0
+        index = faiss.read_index(str(store_dir / INDEX_FILE), flags)
+        
+        docstore_path = store_dir / DOCSTORE_FILE
+        if docstore_path.is_file():
+            with open(docstore_path, "rb") as f:
+                saved = json.load(f)
+            docstore = InMemoryDocstore({
+                id: Document(id=id, page_content=page_content, metadata=metadata)
+                for id, (page_content, metadata) in saved["docs"].items()
+            })
+            index_to_docstore_id = dict(zip(saved["labels"], saved["ids"]))
+        else:
+            with open(store_dir / LEGACY_DOCSTORE_FILE, "rb") as f:
+                docstore, index_to_docstore_id = pickle.load(f)
+        
+        # Files of one generation are saved together, disagreeing labels mean they were altered or torn
+        docstore_labels = np.sort(np.fromiter(index_to_docstore_id, dtype=np.int64, count=len(index_to_docstore_id)))
+        if not np.array_equal(self._index_labels(index), docstore_labels):
+            raise ValueError(f"index labels do not match the docstore ({index.ntotal} vectors, {len(docstore_labels)} documents)")
+        
+        self._mmapped = mmap
+        return _VectorStore(self.embeddings, index, docstore, index_to_docstore_id, distance_strategy=self._distance_strategy)
+    
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes) -> None:
+        """
+        Write a file through a temporary sibling and rename it into place
+        
+        Args:
+            path: Destination file
+            data: File content
+        """
+        tmp_path = path.with_name(f"{path.name}.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    
+    def _write_store(self, vector_store: FAISS, folder: Path, index: Optional[faiss.Index] = None) -> None:
+        """
+        Save a vector store so that a crash never leaves a half-written store
+        
+        The index and docstore are written into a new generation directory, then
+        the CURRENT pointer is replaced atomically, switching both files at once.
+        A crash before the switch leaves the previous generation in place.
+        
+        Args:
+            vector_store: Vector store to save
+            folder: Destination directory
+            index: CPU index to save, defaults to the vector store's index
+        """
+        folder.mkdir(parents=True, exist_ok=True)
+        index_to_docstore_id = vector_store.index_to_docstore_id
+        docs = {
+            id: (doc.page_content, doc.metadata)
+            for id, doc in vector_store.docstore._dict.items()
+        }
+        docstore_bytes = json.dumps(
+            {"labels": list(index_to_docstore_id), "ids": list(index_to_docstore_id.values()), "docs": docs},
+            ensure_ascii=False,
+            default=str,
+        ).encode("utf-8")
+        index_bytes = faiss.serialize_index(vector_store.index if index is None else index)
+        
+        generation = folder / f"{GENERATION_PREFIX}{uuid.uuid4().hex}"
+        generation.mkdir()
+        (generation / DOCSTORE_FILE).write_bytes(docstore_bytes)
+        (generation / INDEX_FILE).write_bytes(index_bytes.tobytes())
+        self._write_atomic(folder / CURRENT_FILE, generation.name.encode("utf-8"))
+        
+        # Drop earlier generations, leftovers of interrupted saves and files saved before generations
+        for path in folder.glob(f"{GENERATION_PREFIX}*"):
+            if path != generation:
+                shutil.rmtree(path, ignore_errors=True)
+        for name in (INDEX_FILE, DOCSTORE_FILE, LEGACY_DOCSTORE_FILE):
+            (folder / name).unlink(missing_ok=True)
+    
+    def _ensure_writable(self) -> None:
+        """
+        Replace a memory-mapped index with a full in-memory copy before it is modified
+        
+        The read-only mapping cannot be written to, and the next save replaces the mapped file.
+        """
+        if not self._mmapped:
+            return
+        logger.info("Reloading memory-mapped index for writing")
+        index = faiss.read_index(str(self._current_dir(FAISS_INDEX_PATH) / INDEX_FILE))
+        self._mmapped = False
+        self._set_index(index)
+    
+    @staticmethod
+    def _wrap(index: faiss.Index) -> faiss.Index:
+        """
+        Make an index store vectors under arbitrary int64 labels
+        
+        IVF indexes take labels natively and look them up through a hashtable
+        direct map. IndexIDMap2 assumes the wrapped index renumbers its vectors
+        after a removal, which IVF does not, so only other indexes are wrapped.
+        
+        Args:
+            index: Vector index
+            
+        Returns:
+            Index accepting add_with_ids and reconstruct by label
+        """
+        if isinstance(index, faiss.IndexIVF):
+            index.set_direct_map_type(faiss.DirectMap.Hashtable)
+            return index
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None:
+            # IVF nested in a transform reconstructs by position, which MMR needs
+            ivf.make_direct_map()
+        return faiss.IndexIDMap2(index)
+    
+    @staticmethod
+    def _unwrap(index: faiss.Index) -> faiss.Index:
+        """
+        Get the vector index inside an IndexIDMap2
+        
+        Args:
+            index: Labelled index
+            
+        Returns:
+            The wrapped index, or the index itself when it holds labels natively
+        """
+        if isinstance(index, faiss.IndexIDMap):
+            return faiss.downcast_index(index.index)
+        return index
+    
+    @staticmethod
+    def _removes_in_place(index: faiss.Index) -> bool:
+        """
+        Check whether remove_ids keeps an index's labels consistent
+        
+        Args:
+            index: Labelled index
+            
+        Returns:
+            True for native-label IVF and IndexIDMap2 over a flat index
+        """
+        if isinstance(index, faiss.IndexIVF):
+            return True
+        return isinstance(index, faiss.IndexIDMap2) and isinstance(faiss.downcast_index(index.index), faiss.IndexFlat)
+    
+    @staticmethod
+    def _index_labels(index: faiss.Index) -> np.ndarray:
+        """
+        Get the labels an index holds vectors under
+        
+        Args:
+            index: Labelled index, or a legacy index numbered by position
+            
+        Returns:
+            Sorted int64 labels
+        """
+        if isinstance(index, faiss.IndexIDMap):
+            labels = faiss.vector_to_array(index.id_map)
+            # Deleted vectors still in the index are labelled -1
+            labels = labels[labels >= 0]
+        elif isinstance(index, faiss.IndexIVF):
+            invlists = index.invlists
+            labels = np.concatenate([np.empty(0, dtype=np.int64)] + [
+                faiss.rev_swig_ptr(invlists.get_ids(list_no), invlists.list_size(list_no)).copy()
+                for list_no in range(index.nlist)
+                if invlists.list_size(list_no)
+            ])
+        else:
+            labels = np.arange(index.ntotal, dtype=np.int64)
+        return np.sort(labels)
+    
+    def _apply_search_params(self, index: faiss.Index) -> None:
+        """
+        Set query-time parameters from configuration or calibration
+        
+        A configured value of 0 is replaced by the cheapest value reaching
+        FAISS_TARGET_RECALL, calibrated once and reused for later indexes.
+        
+        Args:
+            index: CPU index of the configured type
+        """
+        base = self._unwrap(index)
+        if isinstance(base, faiss.IndexHNSW):
+            def set_ef_search(value):
+                base.hnsw.efSearch = value
+            set_ef_search(Config.FAISS_HNSW_EF_SEARCH or self._calibrate("efSearch", index, EF_SEARCH_CANDIDATES, set_ef_search))
+            return
+        
+        try:
+            ivf = faiss.extract_index_ivf(base)
+        except RuntimeError:
+            return
+        def set_nprobe(value):
+            ivf.nprobe = value
+        set_nprobe(Config.FAISS_NPROBE or self._calibrate("nprobe", index, NPROBE_CANDIDATES, set_nprobe))
+    
+    def _calibrate(self, name: str, index: faiss.Index, candidates: Tuple[int, ...], set_param: Callable[[int], None]) -> int:
+        """
+        Find the smallest search parameter value that reaches the target recall
+        
+        Stored vectors are searched as queries, and their exact neighbours serve
+        as ground truth for recall@CALIBRATION_K. The neighbours are found by
+        scanning the stored vectors one block at a time, so calibration never
+        holds a second full copy of the index.
+        
+        Args:
+            name: Parameter name, calibrated values are cached under it
+            index: Labelled index to calibrate, holding the labels of index_to_docstore_id
+            candidates: Parameter values in increasing cost
+            set_param: Function applying a value to the index
+            
+        Returns:
+            Calibrated value, the largest candidate if none reaches the target
+        """
+        if name in self._calibrated:
+            return self._calibrated[name]
+        labels = np.fromiter(self.vector_store.index_to_docstore_id, dtype=np.int64)
+        if len(labels) < CALIBRATION_QUERIES:
+            # Too few vectors to measure recall, and searching them all is cheap anyway
+            return candidates[-1]
+        
+        queries = index.reconstruct_batch(labels[_LABEL_RNG.choice(len(labels), CALIBRATION_QUERIES, replace=False)])
+        heap = faiss.ResultHeap(CALIBRATION_QUERIES, CALIBRATION_K, keep_max=index.metric_type == faiss.METRIC_INNER_PRODUCT)
+        for start in range(0, len(labels), CALIBRATION_BLOCK_SIZE):
+            block = labels[start:start + CALIBRATION_BLOCK_SIZE]
+            distances, positions = faiss.knn(
+                queries, index.reconstruct_batch(block), min(CALIBRATION_K, len(block)), metric=index.metric_type
+            )
+            heap.add_result(distances, block[positions])
+        heap.finalize()
+        truth = heap.I
+        
+        best = candidates[-1]
+        for value in candidates:
+            set_param(value)
+            _, found = index.search(queries, CALIBRATION_K)
+            recall = np.mean([len(np.intersect1d(f, t)) for f, t in zip(found, truth)]) / CALIBRATION_K
+            if recall >= Config.FAISS_TARGET_RECALL:
+                best = value
+                break
+        logger.info(f"✅ Calibrated {name}={best} for recall@{CALIBRATION_K} >= {Config.FAISS_TARGET_RECALL}")
+        self._calibrated[name] = best
+        return best
+    
+    def _set_index(self, index: faiss.Index) -> None:
+        """
+        Install a CPU index in the vector store, moving it to the GPU if enabled
+        
+        Args:
+            index: CPU index
+        """
+        self._index_ready = self._index_matches_config(index)
+        if self._index_ready:
+            self._apply_search_params(index)
+        else:
+            # A staging index is converted once it holds enough vectors to train the configured type
+            configured = self._new_index(index.d)
+            self._train_at = 0 if configured.is_trained else self._training_size(configured)
+        self._gpu_resources = None
+        if Config.FAISS_USE_GPU and hasattr(faiss, "StandardGpuResources") and faiss.get_num_gpus() > 0:
+            try:
+                resources = faiss.StandardGpuResources()
+                index = faiss.index_cpu_to_gpu(resources, 0, index)
+                self._gpu_resources = resources
+            except RuntimeError as e:
+                logger.warning(f"⚠️ Index cannot be moved to GPU, searching on CPU: {e}")
+        self.vector_store.index = index
+    
+    def _cpu_index(self) -> faiss.Index:
+        """
+        Get the vector store index on the CPU
+        
+        Returns:
+            The index itself, or a CPU copy when it lives on the GPU
+        """
+        if self._gpu_resources is None:
+            return self.vector_store.index
+        return faiss.index_gpu_to_cpu(self.vector_store.index)
+    
+    def _build_index(self, dimension: int, training_vectors: Optional[np.ndarray] = None) -> faiss.Index:
+        """
+        Build an empty index of the configured type
+        
+        HNSW gives sub-linear search cost instead of the O(N·d) scan of IndexFlatL2,
+        and unlike IVF it needs no training, so documents can be added incrementally.
+        HNSW vectors are stored as FAISS_QUANT scalars, fp16 halves the bytes read
+        per query and sq8 quarters them at a small recall cost.
+        With the cosine metric vectors are normalized on insert and compared by
+        inner product, which needs fewer operations per pair than L2 distance.
+        Other types are built with faiss.index_factory; types that need training
+        (IVF, PQ, sq8) stay in a flat staging index until enough vectors are available.
+        
+        Args:
+            dimension: Embedding dimension
+            training_vectors: Vectors to train the index on, if it needs training
+            
+        Returns:
+            Empty index, trained if training was required
+        """
+        index = self._new_index(dimension)
+        if not index.is_trained:
+            if training_vectors is None or len(training_vectors) < self._training_size(index):
+                return faiss.IndexFlat(dimension, self._metric)
+            index.train(training_vectors)
+            logger.info(f"✅ Trained {Config.FAISS_INDEX_TYPE} index on {len(training_vectors)} vectors")
+        return index
+    
+    def _new_index(self, dimension: int) -> faiss.Index:
+        """
+        Create an index of the configured type, untrained
+        
+        Args:
+            dimension: Embedding dimension
+            
+        Returns:
+            Empty index
+        """
+        if Config.FAISS_INDEX_TYPE == "HNSW":
+            qtype = _SQ_TYPES.get(Config.FAISS_QUANT)
+            if qtype is None:
+                index = faiss.IndexHNSWFlat(dimension, Config.FAISS_HNSW_M, self._metric)
+            else:
+                index = faiss.IndexHNSWSQ(dimension, qtype, Config.FAISS_HNSW_M, self._metric)
+            index.hnsw.efConstruction = Config.FAISS_HNSW_EF_CONSTRUCTION
+            return index
+        return faiss.index_factory(dimension, Config.FAISS_INDEX_TYPE, self._metric)
+    
+    @staticmethod
+    def _training_size(index: faiss.Index) -> int:
+        """
+        Minimum number of vectors needed to train an index
+        
+        Args:
+            index: Untrained index
+            
+        Returns:
+            39 vectors per IVF list, or per PQ centroid for indexes without lists
+        """
+        if isinstance(index, faiss.IndexHNSWSQ):
+            return SQ_TRAINING_SIZE
+        try:
+            return faiss.extract_index_ivf(index).nlist * 39
+        except RuntimeError:
+            return 256 * 39
+    
+    def _index_matches_config(self, index: faiss.Index) -> bool:
+        """
+        Check whether an index has the configured type and metric
+        
+        Args:
+            index: Index to check
+            
+        Returns:
+            False for indexes of another type or metric, including flat staging indexes
+            and indexes not labelled the way _wrap labels them
+        """
+        if index.metric_type != self._metric:
+            return False
+        if isinstance(index, faiss.IndexIVF):
+            if index.direct_map.type != faiss.DirectMap.Hashtable:
+                return False
+        elif isinstance(index, faiss.IndexIDMap2):
+            index = faiss.downcast_index(index.index)
+            if isinstance(index, faiss.IndexIVF):
+                return False
+        else:
+            return False
+        if Config.FAISS_INDEX_TYPE == "HNSW":
+            qtype = _SQ_TYPES.get(Config.FAISS_QUANT)
+            if qtype is None:
+                return isinstance(index, faiss.IndexHNSWFlat)
+            return isinstance(index, faiss.IndexHNSWSQ) and faiss.downcast_index(index.storage).sq.qtype == qtype
+        return type(index) is type(faiss.index_factory(index.d, Config.FAISS_INDEX_TYPE, self._metric))
+    
+    def _reindex(self, index: faiss.Index, labels: np.ndarray) -> faiss.Index:
+        """
+        Copy vectors from an existing index into a freshly built index of the configured type
+        
+        Vectors keep their labels; indexes saved without labels are addressed by
+        position, which is what their index_to_docstore_id keys hold.
+        
+        Args:
+            index: Source index
+            labels: int64 labels of the vectors to copy
+            
+        Returns:
+            New labelled index holding the selected vectors
+        """
+        ivf = faiss.try_extract_index_ivf(index)
+        if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+            # IVF indexes saved without labels can only be read back by position
+            ivf.make_direct_map()
+        
+        vectors = np.empty((0, index.d), dtype=np.float32)
+        if len(labels):
+            vectors = np.ascontiguousarray(index.reconstruct_batch(labels), dtype=np.float32)
+            if self._metric == faiss.METRIC_INNER_PRODUCT:
+                faiss.normalize_L2(vectors)
+        new_index = self._wrap(self._build_index(index.d, vectors))
+        if len(vectors):
+            new_index.add_with_ids(vectors, labels)
+        return new_index
+    
+    def _delete_ids(self, ids: List[str]) -> None:
+        """
+        Remove documents with the given document IDs from the index and docstore
+        
+        Args:
+            ids: List of document IDs to delete
+            
+        Raises:
+            ValueError: When some IDs are not in the vector store
+        """
+        ids_to_delete = set(ids)
+        index_to_docstore_id = self.vector_store.index_to_docstore_id
+        # Only the labels of the sources involved need checking, not every ID in the store
+        labels = [
+            label
+            for source in {self._source_of(id) for id in ids_to_delete}
+            for label in self._source_to_labels.get(source, ())
+            if index_to_docstore_id[label] in ids_to_delete
+        ]
+        if len(labels) != len(ids_to_delete):
+            missing_ids = ids_to_delete.difference(index_to_docstore_id[label] for label in labels)
+            raise ValueError(f"Some specified ids do not exist in the current store. Ids not found: {missing_ids}")
+        self._delete_labels(labels)
+    
+    def _delete_labels(self, labels: List[int]) -> None:
+        """
+        Remove the vectors with the given FAISS labels and their documents
+        
+        IVF and flat indexes remove vectors in place. HNSW does not support it,
+        so deleted vectors are relabelled -1 and skipped by searches, see
+        _VectorStore. Copying the remaining vectors into a new index takes time
+        linear in the store size, so it is only done once deleted vectors exceed
+        TOMBSTONE_COMPACT_RATIO of the index, and right away for other indexes.
+        
+        Args:
+            labels: FAISS labels of the vectors to delete
+        """
+        self._ensure_writable()
+        index_to_docstore_id = self.vector_store.index_to_docstore_id
+        ids = [index_to_docstore_id.pop(label) for label in labels]
+        self.vector_store.docstore.delete(ids)
+        for label, id in zip(labels, ids):
+            source = self._source_of(id)
+            source_labels = self._source_to_labels[source]
+            source_labels.discard(label)
+            if not source_labels:
+                del self._source_to_labels[source]
+        
+        index = self._cpu_index()
+        if self._removes_in_place(index):
+            index.remove_ids(np.asarray(labels, dtype=np.int64))
+        elif (
+            isinstance(self._unwrap(index), faiss.IndexHNSW)
+            and index.ntotal - len(index_to_docstore_id) <= TOMBSTONE_COMPACT_RATIO * index.ntotal
+        ):
+            # The vectors stay in the graph for navigation, only their labels are cleared
+            id_map = faiss.rev_swig_ptr(index.id_map.data(), index.id_map.size())
+            id_map[np.isin(id_map, labels)] = -1
+        else:
+            index = self._reindex(index, np.fromiter(index_to_docstore_id, dtype=np.int64))
+        self._set_index(index)
     
     def get_retriever(self, k: int = None):
         """
-        Get retriever
+        Get retriever, reused per k while the underlying store is unchanged
         
         Args:
             k: Number of documents to retrieve, defaults to value in configuration
@@ -81,17 +735,84 @@ class FAISSVectorStore:
         Returns:
             Retriever instance
         """
-        search_kwargs = {"k": k or Config.TOP_K}
-        return self.vector_store.as_retriever(search_type="mmr",search_kwargs=search_kwargs)
+        k = k or Config.TOP_K
+        retriever = self._retrievers.get(k)
+        if retriever is None or retriever.vectorstore is not self.vector_store:
+            retriever = self.vector_store.as_retriever(search_type="mmr",search_kwargs={"k": k})
+            self._retrievers[k] = retriever
+        return retriever
+    
+    def _embed_texts(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """
+        Embed texts for indexing
+        
+        Args:
+            texts: Texts to embed
+            batch_size: Texts per embedding request, defaults to the embedding model's own setting
+            
+        Returns:
+            Embeddings aligned with texts
+        """
+        if batch_size and isinstance(self.embeddings, OpenAIEmbeddings):
+            embed = partial(self.embeddings.embed_documents, chunk_size=batch_size)
+        else:
+            embed = self.embeddings.embed_documents
+        
+        workers = min(Config.EMBED_WORKERS, len(texts))
+        if workers <= 1:
+            return embed(texts)
+        
+        # Overlap request round-trips across contiguous shards, map keeps shard order
+        shard_size = -(-len(texts) // workers)
+        shards = [texts[i:i + shard_size] for i in range(0, len(texts), shard_size)]
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            return [vector for shard_vectors in executor.map(embed, shards) for vector in shard_vectors]
+    
+    def _add_vectors(self, vectors: np.ndarray, documents: List[Document], ids: List[str]) -> None:
+        """
+        Add embedded documents to the index, docstore and label mapping
+        
+        The float32 matrix goes straight to index.add_with_ids, skipping the
+        list-to-array copy FAISS.add_embeddings makes. Each vector gets a random
+        int64 label, which index_to_docstore_id maps back to its document ID.
+        
+        Args:
+            vectors: C-contiguous float32 matrix, one row per document
+            documents: Documents the vectors were computed from
+            ids: Document IDs, aligned with documents
+        """
+        index_to_docstore_id = self.vector_store.index_to_docstore_id
+        labels = _LABEL_RNG.integers(0, np.iinfo(np.int64).max, size=len(ids), dtype=np.int64)
+        # Redraw only the labels already in use or repeated within the batch
+        while True:
+            seen = set()
+            collisions = [
+                i for i, label in enumerate(labels.tolist())
+                if label in index_to_docstore_id or label in seen or seen.add(label)
+            ]
+            if not collisions:
+                break
+            labels[collisions] = _LABEL_RNG.integers(0, np.iinfo(np.int64).max, size=len(collisions), dtype=np.int64)
+        
+        # Map the labels first, so a label is never returned by a search before its document exists
+        self.vector_store.docstore.add({
+            id: Document(id=id, page_content=doc.page_content, metadata=doc.metadata)
+            for id, doc in zip(ids, documents)
+        })
+        index_to_docstore_id.update(zip(labels.tolist(), ids))
+        for label, id in zip(labels.tolist(), ids):
+            self._source_to_labels[self._source_of(id)].add(label)
+        self.vector_store.index.add_with_ids(vectors, labels)
     
-    def add_documents(self, documents: List[Document], batch_size: int = 10, ids: Optional[List[str]] = None) -> bool:
+    def add_documents(self, documents: List[Document], batch_size: Optional[int] = None, ids: Optional[List[str]] = None, flush: bool = True) -> bool:
         """
         Add documents to vector store
         
         Args:
             documents: List of document chunks to add
-            batch_size: Batch processing size
+            batch_size: Texts per embedding request, defaults to the embedding model's own setting
             ids: Optional list of document IDs, if provided, length must match documents
+            flush: Whether to save the vector store right away, ignored inside bulk()
             
         Returns:
             Whether documents were successfully added
@@ -102,13 +823,11 @@ class FAISSVectorStore:
         
         # Generate document IDs
         if ids is None:
-            # Generate an ID for each document, format: source_file_path_UUID
-            generated_ids = []
-            for doc in documents:
-                source = doc.metadata.get("file_name", "")
-                doc_uuid = str(uuid.uuid4())
-                generated_ids.append(f"{source}_{doc_uuid}")
-            ids = generated_ids
+            # Generate an ID for each document, format: sourceDocID_UUID
+            ids = [
+                f"{doc.metadata.get('doc_id') or doc.metadata.get('file_name', '')}_{uuid.uuid4().hex}"
+                for doc in documents
+            ]
         
         # Ensure document and ID counts match
         if len(documents) != len(ids):
@@ -116,28 +835,29 @@ class FAISSVectorStore:
             logger.error(error_msg)
             raise ValueError(error_msg)
         
-        # Use document loader service's batch processing capability
-        loader = get_document_loader()
-        batches = loader.batch_process_documents(documents, batch_size)
-        id_batches = [ids[i:i+batch_size] for i in range(0, len(ids), batch_size)]
-        logger.info(f"✅ Document batching complete: {len(batches)} batches")
+        if len(ids) != len(set(ids)):
+            raise ValueError("Duplicate ids found in the ids list.")
         
-        # Vectorize and merge into vector store (using pre-divided batches)
-        for i, (batch, batch_ids) in enumerate(zip(batches, id_batches)):
-            if self.vector_store is None:
-                self.vector_store = FAISS.from_documents(batch, self.embeddings, ids=batch_ids)
-            else:
-                # Use add_documents instead of from_documents and merge_from to pass IDs
-                self.vector_store.add_documents(documents=batch, ids=batch_ids)
-            logger.info(f"✅ Processed batch {i+1}/{len(batches)}")
-        
-        # Save updated vector store locally
-        if self.vector_store:
-            self.vector_store.save_local(str(FAISS_INDEX_PATH))
-            logger.info(f"✅ Vector store update complete, saved to: {FAISS_INDEX_PATH}")
-            return True
+        # Vectorize all documents in one call, the embedding model batches internally
+        texts = [doc.page_content for doc in documents]
+        vectors = np.asarray(self._embed_texts(texts, batch_size), dtype=np.float32, order="C")
+        if self._metric == faiss.METRIC_INNER_PRODUCT:
+            faiss.normalize_L2(vectors)
+        logger.info(f"✅ Embedded {len(texts)} documents")
         
-        return False
+        # Merge precomputed vectors into vector store, searches wait only for this part
+        with self.lock.write():
+            self._ensure_writable()
+            self._add_vectors(vectors, documents, ids)
+            # Train the configured index once the staging index holds enough vectors
+            if not self._index_ready and self.vector_store.index.ntotal >= self._train_at:
+                labels = np.fromiter(self.vector_store.index_to_docstore_id, dtype=np.int64)
+                self._set_index(self._reindex(self._cpu_index(), labels))
+            
+            # Save updated vector store locally
+            self._maybe_save(flush)
+        logger.info("✅ Vector store update complete")
+        return True
     
 
     
@@ -152,7 +872,39 @@ class FAISSVectorStore:
         Returns:
             List of relevant documents
         """
-        return self.vector_store.similarity_search(query, k=k or Config.TOP_K)
+        embedding = self.embeddings.embed_query(query)
+        with self.lock.read():
+            return self.vector_store.similarity_search_by_vector(embedding, k=k or Config.TOP_K)
+    
+    def search_batch(self, queries: List[str], k: int = None) -> List[List[Document]]:
+        """
+        Search for relevant documents for several queries at once
+        
+        All queries are embedded in one call and searched as a single matrix,
+        letting FAISS parallelize across queries.
+        
+        Args:
+            queries: Query texts
+            k: Number of documents to return per query, defaults to value in configuration
+            
+        Returns:
+            List of relevant documents for each query, in query order
+        """
+        if not queries:
+            return []
+        
+        xq = np.asarray(self.embeddings.embed_documents(queries), dtype=np.float32)
+        if self._metric == faiss.METRIC_INNER_PRODUCT:
+            faiss.normalize_L2(xq)
+        with self.lock.read():
+            _, positions = self.vector_store.live_view().index.search(xq, k or Config.TOP_K)
+            
+            index_to_docstore_id = self.vector_store.index_to_docstore_id
+            docstore = self.vector_store.docstore
+            return [
+                [docstore.search(index_to_docstore_id[i]) for i in row if i != -1]
+                for row in positions.tolist()
+            ]
     
     def search_with_score(self, query: str, k: int = None) -> List[tuple]:
         """
@@ -165,74 +917,114 @@ class FAISSVectorStore:
         Returns:
             List of (document, score) tuples
         """
-        return self.vector_store.similarity_search_with_score(query, k=k or Config.TOP_K)
+        embedding = self.embeddings.embed_query(query)
+        with self.lock.read():
+            return self.vector_store.similarity_search_with_score_by_vector(embedding, k=k or Config.TOP_K)
     
-    def save(self, path: Optional[str] = None) -> None:
+    def save(self, path: Optional[str] = None, force: bool = False) -> None:
         """
         Save vector store locally
         
+        Saving to the configured path is skipped when nothing changed since the
+        last save, a changed vector count also counts as a change for stores
+        modified directly through vector_store.
+        
         Args:
             path: Save path, defaults to path in configuration
+            force: Save even if the vector store is unchanged
         """
-        save_path = path or str(FAISS_INDEX_PATH)
-        self.vector_store.save_local(save_path)
-        logger.info(f"✅ Vector store saved to: {save_path}")
+        with self.lock.write():
+            self._save(path, force)
     
-    # def load_documents_and_update(self, document_paths: List[str]) -> bool:
-    #     """
-    #     加载文档并更新向量库
+    def _save(self, path: Optional[str] = None, force: bool = False) -> None:
+        """
+        Save vector store locally, the caller holds the write lock
         
-    #     Args:
-    #         document_paths: 文档路径列表
-            
-    #     Returns:
-    #         是否成功更新
-    #     """
-    #     print(f"\n📚 开始更新知识库（新文档数：{len(document_paths)}）")
+        Args:
+            path: Save path, defaults to path in configuration
+            force: Save even if the vector store is unchanged
+        """
+        save_path = path or str(FAISS_INDEX_PATH)
+        is_default_path = save_path == str(FAISS_INDEX_PATH)
+        ntotal = self.vector_store.index.ntotal
+        if is_default_path and not (force or self._dirty or ntotal != self._saved_ntotal):
+            logger.debug("Vector store unchanged, skipping save")
+            return
         
-    #     # 使用文档加载器服务加载文档
-    #     loader = get_document_loader()
-    #     all_docs = loader.process_documents(document_paths, skip_processed=True)
+        # GPU indexes cannot be serialized, _cpu_index gives a CPU copy
+        self._write_store(self.vector_store, Path(save_path), self._cpu_index())
+        if is_default_path:
+            self._dirty = False
+            self._saved_ntotal = ntotal
+        logger.info(f"✅ Vector store saved to: {save_path}")
+    
+    def flush(self) -> None:
+        """Save the vector store if it has unsaved changes"""
+        self.save()
+    
+    def _maybe_save(self, flush: bool = True) -> None:
+        """
+        Mark the vector store as changed and save it unless saving is deferred
         
-    #     if not all_docs:
-    #         print("⚠️ 无新增文档，知识库未更新")
-    #         return False
+        Args:
+            flush: Whether to save right away, ignored inside bulk()
+        """
+        self._dirty = True
+        if flush and not self._bulk_depth:
+            self._save()
+    
+    @contextmanager
+    def bulk(self) -> Iterator["FAISSVectorStore"]:
+        """
+        Defer saving until the outermost bulk block exits
         
-    #     print(f"✅ 成功加载 {len(all_docs)} 个新文档")
+        Each save rewrites the whole index, so batching many adds or deletes
+        into one block writes it once instead of once per call.
         
-    #     # 添加文档到向量库
-    #     return self.add_documents(all_docs)
+        Yields:
+            This vector store
+        """
+        self._bulk_depth += 1
+        try:
+            yield self
+        finally:
+            self._bulk_depth -= 1
+            if not self._bulk_depth:
+                self.flush()
     
-    from langchain_community.vectorstores import FAISS
-
-
-    # 假设 vector_store 是你已加载的 LangChain FAISS 对象
-    # e.g., vector_store = FAISS(...)
     def clear(self) -> None:
-        # 1) Clear underlying faiss index (memory)
-        import faiss
-        from langchain_community.docstore.in_memory import InMemoryDocstore
-        index: faiss.Index = self.vector_store.index
-        index.reset()  # Clear all vectors (ntotal will become 0)
+        """Remove all documents from the vector store and save it"""
+        with self.lock.write():
+            # 1) Clear underlying faiss index (memory)
+            self._ensure_writable()
+            index: faiss.Index = self.vector_store.index
+            index.reset()  # Clear all vectors (ntotal will become 0)
 
-        # 2) Clear LangChain mappings and docstore (implementation dependent)
-        self.vector_store.index_to_docstore_id = {}   # Clear index->doc id mapping
-        # If there's a docstore, reset to a new empty docstore (example using InMemoryDocstore)
-        try:
-            self.vector_store.docstore = InMemoryDocstore()
-        except Exception:
-            # If reset not possible, can manually delete saved docstore file (method A)
-            pass
+            # 2) Clear LangChain mappings and docstore (implementation dependent)
+            self.vector_store.index_to_docstore_id = {}   # Clear index->doc id mapping
+            self._source_to_labels.clear()
+            # If there's a docstore, reset to a new empty docstore (example using InMemoryDocstore)
+            try:
+                self.vector_store.docstore = InMemoryDocstore()
+            except Exception:
+                # If reset not possible, can manually delete saved docstore file (method A)
+                pass
 
-        # 3) Save and overwrite locally (overwrite original index file/directory)
-        self.vector_store.save_local(str(FAISS_INDEX_PATH))  # Overwrite previously saved location
+            # 3) Save and overwrite locally (overwrite original index file/directory)
+            self._maybe_save()  # Overwrite previously saved location
+        
+        # Cached embeddings belong to the cleared documents
+        if isinstance(self.embeddings, CachedOpenAIEmbeddings):
+            self.embeddings.clear_cache()
         logger.info("Index has been reset and saved to faiss_index")
-    def delete(self, ids: List[str]) -> bool:
+    
+    def delete(self, ids: List[str], flush: bool = True) -> bool:
         """
         Delete documents with specified IDs from vector store
         
         Args:
             ids: List of document IDs to delete
+            flush: Whether to save the vector store right away, ignored inside bulk()
             
         Returns:
             Whether deletion was successful
@@ -242,21 +1034,23 @@ class FAISSVectorStore:
             return False
         
         try:
-            self.vector_store.delete(ids=ids)
-            # Save updated vector store locally
-            self.save()
+            with self.lock.write():
+                self._delete_ids(ids)
+                # Save updated vector store locally
+                self._maybe_save(flush)
             logger.info(f"✅ Successfully deleted {len(ids)} documents")
             return True
         except Exception as e:
             logger.error(f"⚠️ Failed to delete documents: {e}")
             return False
     
-    def delete_by_source(self, doc_id:str) -> bool:
+    def delete_by_source(self, doc_id:str, flush: bool = True) -> bool:
         """
         Delete documents from a specific source file from vector store
 
         Args:
-            doc_id: Source filename
+            doc_id: Source document ID
+            flush: Whether to save the vector store right away, ignored inside bulk()
 
         Returns:
             Whether deletion was successful
@@ -266,41 +1060,24 @@ class FAISSVectorStore:
             return False
         
         try:
-            # Get all document IDs
-            all_ids = list(self.vector_store.index_to_docstore_id.values())
-            logger.debug(f"all_ids: {all_ids}")
-            
-            # Find matching IDs
-            ids_to_delete = []
-
-            for id in all_ids:
-                # Ignore UUID part
-                if id.startswith(f"{doc_id}_"):
-                    ids_to_delete.append(id)
-            
-            if not ids_to_delete:
-                logger.warning("⚠️ No matching documents found")
-                return False
-            
-            # Delete matching documents
-            self.vector_store.delete(ids=ids_to_delete)
-            
-            # Save updated vector store locally
-            self.save()
-            logger.info(f"✅ Successfully deleted {len(ids_to_delete)} documents")
+            with self.lock.write():
+                # Look up the FAISS labels of this source's chunks
+                labels = list(self._source_to_labels.get(doc_id, ()))
+                
+                if not labels:
+                    logger.warning("⚠️ No matching documents found")
+                    return False
+                
+                # Delete matching documents
+                self._delete_labels(labels)
+                
+                # Save updated vector store locally
+                self._maybe_save(flush)
+            logger.info(f"✅ Successfully deleted {len(labels)} documents")
             return True
         except Exception as e:
             logger.error(f"⚠️ Failed to delete documents: {e}")
             return False
-    
-    # def clear(self) -> None:
-    #     """清空向量库"""
-    #     # 创建一个新的空向量库
-    #     self.vector_store = FAISS.from_texts(
-    #         ["初始化文档"], self.embeddings
-    #     )
-    #     self.save()
-    #     print("✅ 向量库已清空")
 
 
 # Global singleton
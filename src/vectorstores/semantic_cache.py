@@ -0,0 +1,129 @@
+"""
+Semantic Query Cache
+
+This module caches retrieval results keyed by query embedding. A query whose embedding is
+close enough (cosine similarity) to a cached one reuses the cached documents, so repeated or
+paraphrased follow-up questions skip the vector store search entirely.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import faiss
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.config import Config
+from src.utils.logging_config import get_logger
+
+# Initialize logger
+logger = get_logger(__name__)
+
+class SemanticCache:
+    """Embedding-keyed cache of retrieval results with TTL and LRU eviction"""
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        threshold: Optional[float] = None,
+        ttl: Optional[int] = None,
+        max_size: Optional[int] = None
+    ):
+        """
+        Initialize semantic cache
+
+        Args:
+            embeddings: Embedding model used to embed queries
+            threshold: Minimum cosine similarity for a hit, defaults to value in configuration
+            ttl: Entry lifetime in seconds, defaults to value in configuration
+            max_size: Maximum number of cached queries, defaults to value in configuration
+        """
+        self.embeddings = embeddings
+        self.threshold = threshold if threshold is not None else Config.SEMANTIC_CACHE_THRESHOLD
+        self.ttl = ttl if ttl is not None else Config.SEMANTIC_CACHE_TTL
+        self.max_size = max_size or Config.SEMANTIC_CACHE_MAX_SIZE
+
+        # Exact inner-product search over at most max_size normalized vectors;
+        # unlike HNSW it supports removing entries on eviction
+        self._index: Optional[faiss.IndexIDMap2] = None
+        self._entries: "OrderedDict[int, Tuple[List[Document], float]]" = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(embedding: List[float]) -> np.ndarray:
+        """Convert an embedding to a normalized float32 row vector"""
+        vector = np.array([embedding], dtype=np.float32)
+        faiss.normalize_L2(vector)
+        return vector
+
+    def _remove(self, entry_ids: List[int]) -> None:
+        """Remove entries from both the index and the entry table"""
+        for entry_id in entry_ids:
+            self._entries.pop(entry_id, None)
+        self._index.remove_ids(np.array(entry_ids, dtype=np.int64))
+
+    def _evict_expired(self) -> None:
+        """Drop entries older than the TTL"""
+        deadline = time.monotonic() - self.ttl
+        expired = [entry_id for entry_id, (_, created) in self._entries.items() if created < deadline]
+        if expired:
+            self._remove(expired)
+
+    def lookup(self, embedding: List[float]) -> Optional[List[Document]]:
+        """
+        Look up documents cached for a similar query
+
+        Args:
+            embedding: Query embedding
+
+        Returns:
+            Cached documents, or None on a miss
+        """
+        with self._lock:
+            if self._index is None:
+                return None
+            self._evict_expired()
+            if not self._entries:
+                return None
+
+            scores, ids = self._index.search(self._normalize(embedding), 1)
+            entry_id = int(ids[0, 0])
+            if entry_id == -1 or scores[0, 0] < self.threshold:
+                return None
+
+            self._entries.move_to_end(entry_id)
+            logger.debug(f"Semantic cache hit (similarity: {scores[0, 0]:.3f})")
+            return self._entries[entry_id][0]
+
+    def add(self, embedding: List[float], docs: List[Document]) -> None:
+        """
+        Cache documents retrieved for a query
+
+        Args:
+            embedding: Query embedding
+            docs: Retrieved documents
+        """
+        vector = self._normalize(embedding)
+        with self._lock:
+            if self._index is None:
+                self._index = faiss.IndexIDMap2(faiss.IndexFlatIP(vector.shape[1]))
+
+            entry_id = self._next_id
+            self._next_id += 1
+            self._index.add_with_ids(vector, np.array([entry_id], dtype=np.int64))
+            self._entries[entry_id] = (docs, time.monotonic())
+
+            # Evict least recently used entries
+            if len(self._entries) > self.max_size:
+                overflow = len(self._entries) - self.max_size
+                self._remove(list(self._entries)[:overflow])
+
+    def clear(self) -> None:
+        """Clear all cached entries, e.g. after the knowledge base changes"""
+        with self._lock:
+            self._entries.clear()
+            if self._index is not None:
+                self._index.reset()
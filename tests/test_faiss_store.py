@@ -0,0 +1,231 @@
+"""
+FAISS vector store tests
+
+Each index type is exercised through add, delete, search and reload against a
+temporary index directory, with a deterministic fake embedding model.
+"""
+import shutil
+import tempfile
+import threading
+import unittest
+import zlib
+from pathlib import Path
+from unittest import mock
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from src.config import Config
+from src.vectorstores import faiss_store
+
+DIMENSION = 16
+
+
+class HashEmbeddings(Embeddings):
+    """Embeds each text as a fixed random vector seeded by its checksum"""
+
+    def embed_documents(self, texts):
+        return [self.embed_query(text) for text in texts]
+
+    def embed_query(self, text):
+        return np.random.default_rng(zlib.crc32(text.encode("utf-8"))).standard_normal(DIMENSION).tolist()
+
+
+class FAISSVectorStoreTest(unittest.TestCase):
+    """Store behaviour for each supported index type"""
+
+    INDEX_TYPES = ("HNSW", "Flat", "IVF4,Flat")
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        for patcher in (
+            mock.patch.object(faiss_store, "FAISS_INDEX_PATH", Path(self.tmp_dir.name)),
+            mock.patch.object(Config, "EMBED_DIM", DIMENSION),
+            mock.patch.object(Config, "FAISS_MMAP", False),
+            mock.patch.object(Config, "FAISS_USE_GPU", False),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _reset_store_dir(self):
+        shutil.rmtree(faiss_store.FAISS_INDEX_PATH)
+        faiss_store.FAISS_INDEX_PATH.mkdir()
+
+    def _new_store(self):
+        return faiss_store.FAISSVectorStore(HashEmbeddings())
+
+    def _add_sources(self, store, sources, per_source=100):
+        store.add_documents([
+            Document(page_content=f"text {i}", metadata={"doc_id": source})
+            for n, source in enumerate(sources)
+            for i in range(n * per_source, (n + 1) * per_source)
+        ])
+
+    def test_add_delete_search_reload(self):
+        for index_type in self.INDEX_TYPES:
+            with self.subTest(index_type=index_type), mock.patch.object(Config, "FAISS_INDEX_TYPE", index_type):
+                self._reset_store_dir()
+                store = self._new_store()
+                self._add_sources(store, ["src0", "src1", "src2"])
+                self.assertTrue(store._index_ready)
+
+                self.assertTrue(store.delete_by_source("src1"))
+                self.assertEqual(store.vector_store.index.ntotal, 200)
+                self.assertEqual(store.search("text 5", k=1)[0].page_content, "text 5")
+                self.assertEqual(store.search("text 250", k=1)[0].page_content, "text 250")
+                self.assertNotEqual(store.search("text 150", k=1)[0].page_content, "text 150")
+
+                last_id = store.vector_store.index_to_docstore_id[next(iter(store._source_to_labels["src2"]))]
+                self.assertTrue(store.delete([last_id]))
+                self.assertEqual(len(store.vector_store.index_to_docstore_id), 199)
+
+                reloaded = self._new_store()
+                self.assertEqual(len(reloaded.vector_store.index_to_docstore_id), 199)
+                self.assertEqual(reloaded.search("text 42", k=1)[0].page_content, "text 42")
+                self.assertEqual(set(reloaded._source_to_labels), {"src0", "src2"})
+                self.assertEqual(len(reloaded.get_retriever(k=3).invoke("text 7")), 3)
+
+    def test_mmr_retriever_on_quantized_and_transformed_ivf(self):
+        for index_type in ("IVF4,PQ4x4", "PCA8,IVF4,Flat"):
+            with self.subTest(index_type=index_type), mock.patch.object(Config, "FAISS_INDEX_TYPE", index_type):
+                self._reset_store_dir()
+                store = self._new_store()
+                self._add_sources(store, ["src0", "src1", "src2"])
+                self.assertTrue(store._index_ready)
+                self.assertEqual(len(store.get_retriever(k=3).invoke("text 7")), 3)
+                self.assertTrue(store.delete_by_source("src0"))
+                self.assertEqual(len(store.get_retriever(k=3).invoke("text 150")), 3)
+
+    def test_hnsw_deletes_keep_index_until_compaction(self):
+        with mock.patch.object(Config, "FAISS_INDEX_TYPE", "HNSW"):
+            store = self._new_store()
+            self._add_sources(store, ["src0", "src1", "src2"])
+            index = store.vector_store.index
+            index_to_docstore_id = store.vector_store.index_to_docstore_id
+            ids = [id for id in index_to_docstore_id.values() if faiss_store.FAISSVectorStore._source_of(id) == "src0"][:10]
+            deleted_texts = {store.vector_store.docstore.search(id).page_content for id in ids}
+
+            self.assertTrue(store.delete(ids))
+            self.assertIs(store.vector_store.index, index)
+            self.assertEqual(index.ntotal, 300)
+            for results in [store.search(text, k=5) for text in deleted_texts] + store.search_batch(list(deleted_texts), k=5):
+                self.assertFalse(deleted_texts & {doc.page_content for doc in results})
+            self.assertEqual(len(store.get_retriever(k=3).invoke(next(iter(deleted_texts)))), 3)
+
+            reloaded = self._new_store()
+            self.assertEqual(len(reloaded.vector_store.index_to_docstore_id), 290)
+            self.assertNotIn(reloaded.search(next(iter(deleted_texts)), k=1)[0].page_content, deleted_texts)
+
+            # Deleting past TOMBSTONE_COMPACT_RATIO rebuilds the index without the deleted vectors
+            self.assertTrue(reloaded.delete_by_source("src1"))
+            self.assertEqual(reloaded.vector_store.index.ntotal, 190)
+            self.assertEqual(reloaded.search("text 250", k=1)[0].page_content, "text 250")
+
+    def test_staging_index_appends_until_training_size(self):
+        with mock.patch.object(Config, "FAISS_INDEX_TYPE", "IVF16,Flat"):
+            store = self._new_store()
+            with mock.patch.object(store, "_reindex", wraps=store._reindex) as reindex:
+                for n in range(6):
+                    self._add_sources(store, [f"src{n}"])
+                self.assertFalse(store._index_ready)
+                self.assertEqual(reindex.call_count, 0)
+                self._add_sources(store, ["src6"])
+                self.assertTrue(store._index_ready)
+                self.assertEqual(reindex.call_count, 1)
+            self.assertEqual(store.vector_store.index.ntotal, 700)
+            self.assertEqual(store.search("text 3", k=1)[0].page_content, "text 3")
+
+    def test_interrupted_save_keeps_previous_store(self):
+        for index_type in self.INDEX_TYPES:
+            with self.subTest(index_type=index_type), mock.patch.object(Config, "FAISS_INDEX_TYPE", index_type):
+                self._reset_store_dir()
+                store = self._new_store()
+                self._add_sources(store, ["src0", "src1", "src2"])
+                # Fail the save after the new generation is written but before CURRENT points to it
+                with mock.patch.object(store, "_write_atomic", side_effect=OSError("disk full")):
+                    self.assertFalse(store.delete_by_source("src1"))
+                self.assertEqual(len(list(faiss_store.FAISS_INDEX_PATH.glob(f"{faiss_store.GENERATION_PREFIX}*"))), 2)
+
+                reloaded = self._new_store()
+                self.assertEqual(reloaded.vector_store.index.ntotal, 300)
+                self.assertEqual(set(reloaded._source_to_labels), {"src0", "src1", "src2"})
+                self.assertEqual(reloaded.search("text 150", k=1)[0].page_content, "text 150")
+
+    def test_unreadable_store_is_kept_instead_of_replaced(self):
+        store = self._new_store()
+        self._add_sources(store, ["src0", "src1"])
+        index_path = store._current_dir(faiss_store.FAISS_INDEX_PATH) / faiss_store.INDEX_FILE
+        index_path.write_bytes(b"not an index")
+
+        with self.assertRaises(RuntimeError):
+            self._new_store()
+        self.assertEqual(index_path.read_bytes(), b"not an index")
+        self.assertTrue(index_path.with_name(faiss_store.DOCSTORE_FILE).is_file())
+
+    def test_store_saved_before_generations_loads_and_migrates(self):
+        store = self._new_store()
+        self._add_sources(store, ["src0", "src1"])
+        root = faiss_store.FAISS_INDEX_PATH
+        generation = store._current_dir(root)
+        for name in (faiss_store.INDEX_FILE, faiss_store.DOCSTORE_FILE):
+            generation.joinpath(name).rename(root / name)
+        generation.rmdir()
+        root.joinpath(faiss_store.CURRENT_FILE).unlink()
+
+        reloaded = self._new_store()
+        self.assertEqual(reloaded.vector_store.index.ntotal, 200)
+        self.assertTrue(reloaded.delete_by_source("src0"))
+        self.assertFalse(root.joinpath(faiss_store.INDEX_FILE).exists())
+        self.assertEqual(self._new_store().vector_store.index.ntotal, 100)
+
+    def test_colliding_labels_are_redrawn(self):
+        store = self._new_store()
+        self._add_sources(store, ["src0"], per_source=1)
+        existing = next(iter(store.vector_store.index_to_docstore_id))
+        draws = [np.array([existing, 5, 5], dtype=np.int64), np.array([7, 8], dtype=np.int64)]
+        rng = mock.Mock(integers=mock.Mock(side_effect=draws))
+        with mock.patch.object(faiss_store, "_LABEL_RNG", rng):
+            self._add_sources(store, ["src1"], per_source=3)
+        self.assertEqual(set(store.vector_store.index_to_docstore_id), {existing, 5, 7, 8})
+        self.assertEqual(store.vector_store.index.ntotal, 4)
+
+    def test_searches_run_safely_during_adds_and_deletes(self):
+        for index_type in self.INDEX_TYPES:
+            with self.subTest(index_type=index_type), mock.patch.object(Config, "FAISS_INDEX_TYPE", index_type):
+                self._reset_store_dir()
+                store = self._new_store()
+                self._add_sources(store, ["src0", "src1", "src2"])
+                done = threading.Event()
+                errors = []
+
+                def search():
+                    try:
+                        while not done.is_set():
+                            store.search("text 5", k=3)
+                            store.search_batch(["text 7", "text 250"], k=3)
+                            with store.lock.read():
+                                store.get_retriever(k=3).invoke("text 9")
+                    except Exception as e:
+                        errors.append(e)
+
+                readers = [threading.Thread(target=search) for _ in range(4)]
+                for reader in readers:
+                    reader.start()
+                for n in range(5):
+                    store.add_documents([
+                        Document(page_content=f"extra {n} {i}", metadata={"doc_id": f"extra{n}"})
+                        for i in range(20)
+                    ], flush=False)
+                    self.assertTrue(store.delete_by_source(f"extra{n}", flush=False))
+                done.set()
+                for reader in readers:
+                    reader.join()
+
+                self.assertEqual(errors, [])
+                self.assertEqual(len(store.vector_store.index_to_docstore_id), 300)
+
+
+if __name__ == "__main__":
+    unittest.main()